@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""월간미션 계산 파이프라인 벤치마크 - 합성 데이터로 단계별 시간 측정 및 기준 결과와 비교
+
+로컬 PostgreSQL을 DB_* 환경변수로 지정해서 실행 (운영 DB 기본값으로는 실행되지 않음):
+    # 합성 데이터 적재 (b_class_userplaylog, user_user, b_class_bplace를 새로 만듦)
+    DB_HOST=localhost DB_NAME=bench DB_USER=postgres DB_PASSWORD= \\
+        python3 benchmark.py --load --rows 1000000 --users 20000 --branches 300
+    
+    # 측정 후 결과 저장, 기준 결과와 비교 (느려진 단계가 있으면 종료 코드 1)
+    python3 benchmark.py --output bench.json --baseline bench_baseline.json
+"""
+
+from business_calendar import BusinessCalendar
+from db_connector import PostgreSQLConnector
+from db_query_tool import DatabaseQueryTool
+from monthly_mission_calculator import MonthlyMissionCalculator
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from flask import Flask
+
+def load_dataset(db, rows, users, branches, start_month, span_months, seed, chunk_size=5000000):
+    """합성 데이터셋 적재 (같은 seed면 같은 데이터)
+    
+    사용자마다 주로 다니는 지점이 있고, 기록은 start_month부터 span_months개월에 고르게 분포
+    """
+    start_year, start_month_number = start_month
+    end_index = start_year * 12 + start_month_number - 1 + span_months
+    start_date = f"{start_year}-{start_month_number:02d}-01"
+    end_date = f"{end_index // 12}-{end_index % 12 + 1:02d}-01"
+    
+    statements = [
+        "DROP TABLE IF EXISTS b_class_userplaylog, user_user, b_class_bplace",
+        "CREATE TABLE b_class_bplace (id integer PRIMARY KEY, name text)",
+        "CREATE TABLE user_user (id integer PRIMARY KEY, name text, phone_number text)",
+        """CREATE TABLE b_class_userplaylog (
+            id bigint PRIMARY KEY,
+            user_id integer,
+            b_place_id integer,
+            start_datetime timestamp with time zone,
+            device_type text,
+            distance numeric
+        )""",
+        f"SELECT setseed({seed})",
+        f"INSERT INTO b_class_bplace SELECT g, '지점' || g FROM generate_series(1, {branches}) g",
+        f"""INSERT INTO user_user
+            SELECT g, '회원' || g, '010' || LPAD(g::text, 8, '0') FROM generate_series(1, {users}) g""",
+    ]
+    for statement in statements:
+        if db.execute_query(statement) is None:
+            return False
+    
+    # 큰 데이터셋은 나눠서 적재 (진행 상황 표시)
+    for first in range(1, rows + 1, chunk_size):
+        last = min(first + chunk_size - 1, rows)
+        result = db.execute_query(f"""
+        INSERT INTO b_class_userplaylog
+        SELECT
+            g,
+            u,
+            -- 10%는 다른 지점 이용
+            CASE WHEN random() < 0.9 THEN 1 + u % {branches} ELSE 1 + floor(random() * {branches})::int END,
+            timestamptz '{start_date}' + random() * (timestamptz '{end_date}' - timestamptz '{start_date}'),
+            (ARRAY['treadmill', 'treadmill', 'cycle', 'rowing'])[1 + floor(random() * 4)::int],
+            ROUND((300 + random() * 9700)::numeric, 1)
+        FROM (
+            SELECT g, 1 + floor(random() * {users})::int AS u
+            FROM generate_series({first}, {last}) g
+        ) s
+        """)
+        if result is None:
+            return False
+        print(f"📥 {last:,}/{rows:,}개 기록 적재")
+    
+    for statement in (
+        "CREATE INDEX ON b_class_userplaylog (start_datetime)",
+        "ANALYZE b_class_userplaylog",
+        "ANALYZE user_user",
+        "ANALYZE b_class_bplace",
+    ):
+        if db.execute_query(statement) is None:
+            return False
+    return True
+
+def dataset_info(db):
+    """현재 DB에 적재된 데이터셋 규모와 기간"""
+    result = db.execute_query("""
+    SELECT
+        (SELECT COUNT(*) FROM b_class_userplaylog),
+        (SELECT COUNT(*) FROM user_user),
+        (SELECT COUNT(*) FROM b_class_bplace),
+        (SELECT MIN(start_datetime) FROM b_class_userplaylog),
+        (SELECT MAX(start_datetime) FROM b_class_userplaylog),
+        current_setting('server_version')
+    """)
+    if result is None:
+        return None
+    rows, users, branches, first, last, server_version = result['data'][0]
+    return {
+        'rows': rows,
+        'users': users,
+        'branches': branches,
+        'first_record': first.isoformat() if first else None,
+        'last_record': last.isoformat() if last else None,
+        'postgres': server_version
+    }
+
+@contextmanager
+def quiet():
+    """내보내기 함수의 진행 메시지 숨기기"""
+    with redirect_stdout(io.StringIO()):
+        yield
+
+def measure(func, repeat):
+    """func를 repeat번 실행해서 (결과, 실행 시간 목록) 반환"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return result, timings
+
+def summarize(timings):
+    return {
+        'runs': len(timings),
+        'median_ms': round(statistics.median(timings) * 1000, 2),
+        'min_ms': round(min(timings) * 1000, 2),
+        'max_ms': round(max(timings) * 1000, 2)
+    }
+
+def run_benchmark(db, year, month, repeat, export_rows, skip_exports=False):
+    """단계별 측정 {단계 이름: 통계} (캐시 없이 매번 DB에서 조회)"""
+    calculator = MonthlyMissionCalculator(db=db)
+    flask_app = Flask(__name__)
+    stages = {}
+    
+    def stage(name, func, times=repeat):
+        result, timings = measure(func, times)
+        stages[name] = summarize(timings)
+        print(f"⏱️ {name}: {stages[name]['median_ms']:,.1f}ms")
+        return result
+    
+    # 조회 단계
+    prev_month_data = stage('query.previous_month', lambda: calculator.get_previous_month_data(year, month))
+    branch_weekday_data = stage('query.branch_weekday', lambda: calculator.get_branch_weekday_data(year, month))
+    stage('query.combined', lambda: calculator.get_combined_month_data(year, month))
+    if prev_month_data is None or branch_weekday_data is None:
+        raise RuntimeError("벤치마크 쿼리 실행 실패")
+    
+    # 계산 단계 (짧은 단계는 여러 번 실행해서 측정 오차를 줄임)
+    stage('calc.weekday_averages', lambda: calculator.calculate_weekday_averages(prev_month_data))
+    
+    def business_days():
+        # 매번 새 달력으로 계산 (연도별로 한 번 미리 계산해 두는 비용 포함)
+        calendar = BusinessCalendar()
+        return calendar.get_business_days(year, month), calendar.get_weekday_business_days(year, month)
+    stage('calc.business_days', business_days, times=repeat * 10)
+    
+    result = stage('calc.build_result', lambda: calculator.build_mission_result(
+        year, month, prev_month_data, branch_weekday_data
+    ))
+    stage('serialize.json', lambda: flask_app.json.dumps(result))
+    stage('calc.total', lambda: calculator.calculate_mission_target(year, month))
+    
+    if skip_exports:
+        return stages
+    
+    # 내보내기 단계 (이전 달 원본 기록 export_rows개)
+    # Excel은 시간대가 있는 날짜를 저장할 수 없으므로 시간은 세션 시간대 기준 timestamp로 내보냄
+    start_date, end_date = calculator.get_previous_month_range(year, month)
+    export_query = f"""
+    SELECT id, user_id, b_place_id, start_datetime::timestamp AS start_datetime, device_type, distance
+    FROM b_class_userplaylog
+    WHERE start_datetime >= '{start_date}' AND start_datetime < '{end_date}'
+    ORDER BY id
+    LIMIT {export_rows}
+    """
+    tool = DatabaseQueryTool()
+    tool.db = db
+    
+    def streamed():
+        return db.execute_query(export_query, stream=True, itersize=tool.STREAM_ITERSIZE)
+    
+    exporters = {
+        'export.csv': lambda: db.save_to_csv(streamed(), 'bench.csv'),
+        'export.copy_csv': lambda: db.copy_to_csv(export_query, 'bench_copy.csv'),
+        'export.copy_csv_gzip': lambda: db.copy_to_csv(export_query, 'bench_copy.csv.gz'),
+        'export.excel': lambda: db.save_to_excel_streaming(streamed(), 'bench.xlsx'),
+        'export.parquet': lambda: db.save_to_parquet(streamed(), 'bench.parquet'),
+        'export.appscript': lambda: tool.save_appscript_file(
+            tool.generate_appscript_code(streamed())[0], 'bench.js'
+        ),
+        'export.appscript_chunked': lambda: tool.export_query_to_appscript_chunked(export_query),
+    }
+    
+    working_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as output_dir:
+        os.chdir(output_dir)
+        try:
+            for name, export in exporters.items():
+                with quiet():
+                    result, timings = measure(export, repeat)
+                if not result:
+                    print(f"⚠️ {name}: 실패 (건너뜀)")
+                    continue
+                stages[name] = summarize(timings)
+                print(f"⏱️ {name}: {stages[name]['median_ms']:,.1f}ms")
+        finally:
+            os.chdir(working_dir)
+    
+    return stages
+
+def compare_with_baseline(stages, baseline, threshold, noise_ms):
+    """기준 결과와 단계별 중앙값 비교 - 느려진 단계 목록 반환
+    
+    threshold 비율 이상 느려지고 차이가 noise_ms보다 큰 경우만 느려진 것으로 판단
+    """
+    regressions = []
+    print(f"\n{'단계':<28}{'기준(ms)':>12}{'현재(ms)':>12}{'변화':>10}")
+    for name, current in stages.items():
+        previous = baseline.get('stages', {}).get(name)
+        if previous is None:
+            print(f"{name:<28}{'-':>12}{current['median_ms']:>12,.1f}{'new':>10}")
+            continue
+        ratio = current['median_ms'] / previous['median_ms'] if previous['median_ms'] else 1.0
+        regressed = ratio > 1 + threshold and current['median_ms'] - previous['median_ms'] > noise_ms
+        marker = ' ⚠️' if regressed else ''
+        print(f"{name:<28}{previous['median_ms']:>12,.1f}{current['median_ms']:>12,.1f}{(ratio - 1) * 100:>+9.1f}%{marker}")
+        if regressed:
+            regressions.append({'stage': name, 'baseline_ms': previous['median_ms'],
+                                'current_ms': current['median_ms'], 'ratio': round(ratio, 3)})
+    return regressions
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def parse_month(value):
+    year, month = (int(part) for part in value.split('-'))
+    return year, month
+
+def main():
+    parser = argparse.ArgumentParser(description='월간미션 계산 파이프라인 벤치마크')
+    parser.add_argument('--load', action='store_true', help='합성 데이터셋을 새로 적재 (기존 테이블 삭제)')
+    parser.add_argument('--rows', type=int, default=100000, help='유산소 기록 수 (1만 ~ 5천만)')
+    parser.add_argument('--users', type=int, default=5000, help='사용자 수')
+    parser.add_argument('--branches', type=int, default=100, help='지점 수')
+    parser.add_argument('--start-month', type=parse_month, default=(2025, 1), help='데이터 시작 월 (YYYY-MM)')
+    parser.add_argument('--span-months', type=int, default=3, help='데이터 기간 (개월)')
+    parser.add_argument('--seed', type=float, default=0.42, help='난수 seed (-1 ~ 1)')
+    parser.add_argument('--target', type=parse_month, help='목표 월 (기본: 데이터 시작 월의 다음 달)')
+    parser.add_argument('--repeat', type=int, default=5, help='단계별 반복 횟수')
+    parser.add_argument('--export-rows', type=int, default=50000, help='내보내기 단계에서 내보낼 행 수')
+    parser.add_argument('--skip-exports', action='store_true', help='내보내기 단계 생략')
+    parser.add_argument('--output', help='측정 결과를 저장할 JSON 파일')
+    parser.add_argument('--baseline', help='비교할 기준 결과 JSON 파일')
+    parser.add_argument('--threshold', type=float, default=0.10, help='느려짐으로 판단할 비율 (기본 10%%)')
+    parser.add_argument('--noise-ms', type=float, default=5.0, help='이보다 작은 차이는 무시 (ms)')
+    args = parser.parse_args()
+    
+    if 'DB_HOST' not in os.environ:
+        print("❌ 벤치마크는 로컬 DB에서만 실행합니다. DB_HOST 등 DB_* 환경변수를 지정하세요.")
+        sys.exit(2)
+    
+    db = PostgreSQLConnector()
+    if not db.connect():
+        sys.exit(2)
+    
+    try:
+        if args.load:
+            print(f"🧪 합성 데이터 적재: 기록 {args.rows:,}개, 사용자 {args.users:,}명, 지점 {args.branches:,}개")
+            started = time.perf_counter()
+            if not load_dataset(db, args.rows, args.users, args.branches,
+                                args.start_month, args.span_months, args.seed):
+                print("❌ 합성 데이터 적재 실패")
+                sys.exit(2)
+            print(f"✅ 적재 완료 ({time.perf_counter() - started:,.1f}초)")
+        
+        info = dataset_info(db)
+        if info is None or not info['rows']:
+            print("❌ 데이터셋이 없습니다. --load로 먼저 적재하세요.")
+            sys.exit(2)
+        
+        year, month = args.target or MonthlyMissionCalculator(db=db).shift_month(*args.start_month, 1)
+        print(f"📊 {info['rows']:,}개 기록으로 {year}년 {month}월 목표 계산 단계 측정 (반복 {args.repeat}회)")
+        stages = run_benchmark(db, year, month, args.repeat, args.export_rows, args.skip_exports)
+    finally:
+        with quiet():
+            db.disconnect()
+    
+    results = {
+        'meta': {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'target': f"{year}-{month:02d}",
+            'repeat': args.repeat,
+            'export_rows': args.export_rows,
+            'dataset': info
+        },
+        'stages': stages
+    }
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('dataset', {}).get('rows') != info['rows']:
+            print("⚠️ 기준 결과와 데이터셋 규모가 다릅니다. 비교 결과를 참고만 하세요.")
+        regressions = compare_with_baseline(stages, baseline, args.threshold, args.noise_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)}개 단계가 기준보다 느려졌습니다.")
+            sys.exit(1)
+        print("\n✅ 기준보다 느려진 단계가 없습니다.")
+
+if __name__ == '__main__':
+    main()
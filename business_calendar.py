@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from datetime import date
+import calendar
+import json
+import os
+import threading
+
+HOLIDAYS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'holidays.json')
+
+class BusinessCalendar:
+    """영업일 달력 (공휴일 휴무, 일요일은 첫째·셋째 주만 운영)
+    
+    연도별로 월 영업일수와 요일별 영업일수를 한 번에 계산해 두고 (year, month)로 바로 조회
+    """
+    WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+    SUNDAY_OPEN_WEEKS = (1, 3)  # 일요일 격주 운영 (월의 첫째 주, 셋째 주)
+    
+    def __init__(self, holidays_file=HOLIDAYS_FILE):
+        self.holidays = {}   # date -> 공휴일 이름
+        self.years = set()   # 공휴일 정보가 있는 연도
+        self._months = {}    # (year, month) -> (영업일수, 요일별 영업일수)
+        self._lock = threading.Lock()
+        self.load_holidays(holidays_file)
+    
+    def load_holidays(self, holidays_file):
+        """공휴일 파일 로드 ({"연도": {"YYYY-MM-DD": "이름", ...}, ...} 형식)"""
+        try:
+            with open(holidays_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            print(f"⚠️ 공휴일 파일이 없습니다: {holidays_file}")
+            return
+        
+        with self._lock:
+            for year, holidays in data.items():
+                self.years.add(int(year))
+                for date_str, name in holidays.items():
+                    self.holidays[date.fromisoformat(date_str)] = name
+            # 공휴일이 바뀌었으므로 계산해 둔 값은 버림
+            self._months.clear()
+    
+    def is_holiday(self, day):
+        """공휴일 여부"""
+        return day in self.holidays
+    
+    def is_business_day(self, day):
+        """영업일 여부"""
+        if day in self.holidays:
+            return False
+        if day.weekday() == 6:
+            return (day.day - 1) // 7 + 1 in self.SUNDAY_OPEN_WEEKS
+        return True
+    
+    def _build_year(self, year):
+        """한 해의 월별 영업일수와 요일별 영업일수 계산"""
+        if year not in self.years:
+            print(f"⚠️ {year}년 공휴일 정보가 없어 공휴일 없이 영업일수를 계산합니다. (holidays.json 확인)")
+        
+        months = {}
+        for month in range(1, 13):
+            weekday_business_days = {}
+            days_in_month = calendar.monthrange(year, month)[1]
+            for day_of_month in range(1, days_in_month + 1):
+                day = date(year, month, day_of_month)
+                if not self.is_business_day(day):
+                    continue
+                weekday = self.WEEKDAYS[day.weekday()]
+                weekday_business_days[weekday] = weekday_business_days.get(weekday, 0) + 1
+            months[(year, month)] = (sum(weekday_business_days.values()), weekday_business_days)
+        return months
+    
+    def _get_month(self, year, month):
+        entry = self._months.get((year, month))
+        if entry is None:
+            with self._lock:
+                entry = self._months.get((year, month))
+                if entry is None:
+                    self._months.update(self._build_year(year))
+                    entry = self._months[(year, month)]
+        return entry
+    
+    def get_business_days(self, year, month):
+        """특정 월의 영업일수"""
+        return self._get_month(year, month)[0]
+    
+    def get_weekday_business_days(self, year, month):
+        """특정 월의 요일별 영업일수 (1일부터 처음 나오는 요일 순서, 영업일이 없는 요일은 제외)"""
+        return dict(self._get_month(year, month)[1])
+
+# 계산기와 API에서 함께 쓰는 기본 달력
+business_calendar = BusinessCalendar()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""유산소 기록 일별 롤업 - (일, 사용자, 지점, 기구)별 가중 거리를 로컬 SQLite에 누적
+
+원본 DB는 읽기 전용 복제본이므로 롤업은 로컬 파일에 저장하고, 실행할 때마다
+마지막으로 처리한 기록 id(high-water mark) 이후의 기록만 집계해서 더함.
+
+id는 커밋 순서가 아니라 시퀀스에서 받은 순서이므로, 먼저 id를 받은 트랜잭션이 늦게 커밋되면
+갱신할 때 그 id가 비어 있을 수 있음. 이렇게 빈 id는 mark에서 GAP_WINDOW개 이내인 동안
+기록해 두고 다음 갱신마다 다시 확인해서 (한 번만) 더함.
+제한: mark보다 GAP_WINDOW개 넘게 뒤처져 커밋된 기록과, 이미 반영한 기록의 수정/삭제는
+반영되지 않으므로 refresh --rebuild로 다시 집계해야 함.
+
+사용법:
+    python3 daily_rollup.py refresh            # 새 기록만 반영
+    python3 daily_rollup.py refresh --rebuild  # 처음부터 다시 집계
+    python3 daily_rollup.py status
+"""
+
+from db_connector import PostgreSQLConnector
+from contextlib import closing
+from datetime import datetime
+from decimal import Decimal
+import argparse
+import os
+import sqlite3
+
+ROLLUP_PATH = os.environ.get('MISSION_ROLLUP_PATH', 'mission_rollup.sqlite3')
+
+# 늦게 커밋될 수 있는 빈 id를 다시 확인하는 범위 (high-water mark에서 이 개수 이내의 id만 추적)
+GAP_WINDOW = 100000
+
+# 원본의 NULL 사용자/지점은 롤업 키에서 이 값으로 저장 (SQLite 기본키는 NULL끼리 같은 값으로 보지 않음)
+MISSING_ID = -1
+
+def _add_decimal(a, b):
+    """거리 합계(문자열) 더하기 - PostgreSQL numeric과 같은 결과가 나오도록 Decimal로 계산"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return str(Decimal(a) + Decimal(b))
+
+class DailyRollup:
+    """(일, 사용자, 지점, 기구)별 가중 거리 롤업"""
+    def __init__(self, path=ROLLUP_PATH):
+        self.path = path
+        with closing(self._connect()) as conn, conn:
+            conn.executescript("""
+            CREATE TABLE IF NOT EXISTS daily_rollup (
+                day TEXT NOT NULL,               -- 'YYYY-MM-DD' (DB 세션 시간대 기준)
+                user_id INTEGER NOT NULL,
+                b_place_id INTEGER NOT NULL,
+                device_type TEXT NOT NULL,
+                distance TEXT,                   -- 가중 거리 합계(m), numeric 정밀도를 유지하려고 문자열로 저장
+                play_count INTEGER NOT NULL,     -- 거리가 있는 기록 수 (평균 계산용)
+                PRIMARY KEY (day, user_id, b_place_id, device_type)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS rollup_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS rollup_gaps (
+                id INTEGER PRIMARY KEY           -- mark 이하인데 갱신할 때 없던 id (늦게 커밋되면 다음 갱신에서 반영)
+            );
+            """)
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.create_function('add_decimal', 2, _add_decimal, deterministic=True)
+        return conn
+    
+    def _get_state(self, conn, key, default=None):
+        row = conn.execute("SELECT value FROM rollup_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+    
+    def _set_state(self, conn, key, value):
+        conn.execute("INSERT OR REPLACE INTO rollup_state (key, value) VALUES (?, ?)", (key, str(value)))
+    
+    def high_water_mark(self):
+        """마지막으로 반영한 b_class_userplaylog.id"""
+        with closing(self._connect()) as conn:
+            return int(self._get_state(conn, 'high_water_mark', 0))
+    
+    def gaps(self):
+        """mark 이하인데 아직 반영하지 않은(늦게 커밋될 수 있는) id 목록"""
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute("SELECT id FROM rollup_gaps ORDER BY id")]
+    
+    def status(self):
+        """롤업 상태 (반영한 마지막 id, 다시 확인할 빈 id 수, 마지막 갱신 시각, 행 수, 기간)"""
+        with closing(self._connect()) as conn:
+            row_count, first_day, last_day = conn.execute(
+                "SELECT COUNT(*), MIN(day), MAX(day) FROM daily_rollup"
+            ).fetchone()
+            return {
+                'path': self.path,
+                'high_water_mark': int(self._get_state(conn, 'high_water_mark', 0)),
+                'pending_gaps': conn.execute("SELECT COUNT(*) FROM rollup_gaps").fetchone()[0],
+                'refreshed_at': self._get_state(conn, 'refreshed_at'),
+                'row_count': row_count,
+                'first_day': first_day,
+                'last_day': last_day
+            }
+    
+    def rebuild(self, db, batch_size=100000):
+        """롤업을 비우고 처음부터 다시 집계 (원본 기록이 수정/삭제된 경우)"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM daily_rollup")
+            conn.execute("DELETE FROM rollup_gaps")
+            self._set_state(conn, 'high_water_mark', 0)
+        return self.refresh(db, batch_size)
+    
+    def refresh(self, db, batch_size=100000, gap_window=GAP_WINDOW):
+        """high-water mark 이후의 기록만 batch_size개씩 집계해서 롤업에 더함
+        
+        첫 배치에서는 전에 비어 있던 id 중 그사이 커밋된 기록도 함께 더하고, 새로 비어 있는 id는
+        mark에서 gap_window개 이내인 것만 기록해 둠 (집계와 빈 id 확인은 한 쿼리라 같은 스냅샷을 봄)
+        배치마다 롤업, 빈 id, high-water mark를 한 트랜잭션으로 저장하므로 중간에 실패해도 다시 실행하면 이어서 진행
+        {'batches', 'rows_merged', 'late_rows', 'high_water_mark'} 반환 (DB 조회 실패 시 None)
+        """
+        high_water_mark = self.high_water_mark()
+        gap_ids = self.gaps()
+        summary = {'batches': 0, 'rows_merged': 0, 'late_rows': 0, 'high_water_mark': high_water_mark}
+        
+        while True:
+            bound = db.execute_query("""
+            SELECT MAX(id) FROM (
+                SELECT id FROM b_class_userplaylog
+                WHERE id > %s
+                ORDER BY id
+                LIMIT %s
+            ) batch
+            """, (high_water_mark, batch_size))
+            if bound is None:
+                return None
+            batch_end = bound['data'][0][0]
+            if batch_end is None:
+                if not gap_ids:
+                    break
+                # 새 기록은 없어도 전에 비어 있던 id는 다시 확인
+                batch_end = high_water_mark
+            
+            result = db.execute_query("""
+            WITH batch AS MATERIALIZED (
+                SELECT id, start_datetime, user_id, b_place_id, device_type, distance
+                FROM b_class_userplaylog
+                WHERE (id > %(high_water_mark)s AND id <= %(batch_end)s) OR id = ANY(%(gap_ids)s)
+            )
+            SELECT
+                0 AS 구분,
+                TO_CHAR(DATE_TRUNC('day', a.start_datetime), 'YYYY-MM-DD') AS day,
+                COALESCE(a.user_id, %(missing_id)s) AS user_id,
+                COALESCE(a.b_place_id, %(missing_id)s) AS b_place_id,
+                COALESCE(a.device_type, '') AS device_type,
+                SUM(w.distance) AS distance,
+                COUNT(w.distance) AS play_count,
+                COUNT(*) FILTER (WHERE a.id <= %(high_water_mark)s) AS late_rows
+            FROM
+                batch a
+            CROSS JOIN LATERAL (
+                SELECT CASE
+                    WHEN a.device_type = 'treadmill' THEN a.distance
+                    WHEN a.device_type = 'cycle' THEN a.distance * 0.4
+                    WHEN a.device_type = 'rowing' THEN a.distance * 0.7
+                    ELSE 0 END AS distance
+            ) w
+            GROUP BY
+                1, 2, 3, 4, 5
+            UNION ALL
+            -- 확인한 범위에서 비어 있는 id (새 범위는 gap_window 이내만)
+            SELECT 1, NULL, NULL, NULL, NULL, NULL, candidate.id, NULL
+            FROM (
+                SELECT generate_series(GREATEST(%(high_water_mark)s, %(batch_end)s - %(gap_window)s) + 1,
+                                       %(batch_end)s) AS id
+                UNION
+                SELECT unnest(%(gap_ids)s::bigint[])
+            ) candidate
+            WHERE NOT EXISTS (SELECT 1 FROM batch WHERE batch.id = candidate.id)
+            """, {'missing_id': MISSING_ID, 'high_water_mark': high_water_mark, 'batch_end': batch_end,
+                  'gap_ids': gap_ids, 'gap_window': gap_window})
+            if result is None:
+                return None
+            
+            rows = []
+            missing = []
+            late_rows = 0
+            for kind, day, user_id, b_place_id, device_type, distance, play_count, late in result['data']:
+                if kind == 1:
+                    missing.append((play_count,))
+                    continue
+                rows.append((day, user_id, b_place_id, device_type,
+                             None if distance is None else str(distance), play_count))
+                late_rows += late
+            with closing(self._connect()) as conn, conn:
+                conn.executemany("""
+                INSERT INTO daily_rollup (day, user_id, b_place_id, device_type, distance, play_count)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (day, user_id, b_place_id, device_type) DO UPDATE SET
+                    distance = add_decimal(distance, excluded.distance),
+                    play_count = play_count + excluded.play_count
+                """, rows)
+                # 다시 확인한 빈 id는 이번 결과의 빈 id로 교체하고, 추적 범위를 벗어난 id는 버림
+                conn.executemany("DELETE FROM rollup_gaps WHERE id = ?", [(gap_id,) for gap_id in gap_ids])
+                conn.executemany("INSERT OR IGNORE INTO rollup_gaps (id) VALUES (?)", missing)
+                conn.execute("DELETE FROM rollup_gaps WHERE id <= ?", (batch_end - gap_window,))
+                self._set_state(conn, 'high_water_mark', batch_end)
+                self._set_state(conn, 'refreshed_at', datetime.now().isoformat(timespec='seconds'))
+            
+            summary['batches'] += 1
+            summary['rows_merged'] += len(rows)
+            summary['late_rows'] += late_rows
+            summary['high_water_mark'] = batch_end
+            if late_rows:
+                print(f"📥 늦게 커밋된 기록 {late_rows:,}개 반영")
+            if batch_end == high_water_mark:
+                break
+            print(f"📥 id {batch_end}까지 반영 ({len(rows):,}개 롤업 행)")
+            high_water_mark = batch_end
+            gap_ids = []
+        
+        return summary
+    
+    def read_range(self, start_date, end_date):
+        """기간 [start_date, end_date)의 (일, 사용자_id, 지점_id, 가중 거리 합계(Decimal), 기록 수) 목록
+        
+        기구별 행은 합쳐서 반환 (거리가 전부 NULL이면 None)
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute("""
+            SELECT day, user_id, b_place_id, distance, play_count
+            FROM daily_rollup
+            WHERE day >= ? AND day < ?
+            ORDER BY day, user_id, b_place_id
+            """, (start_date, end_date)).fetchall()
+        
+        merged = {}
+        for day, user_id, b_place_id, distance, play_count in rows:
+            key = (day, user_id, b_place_id)
+            distance = None if distance is None else Decimal(distance)
+            total = merged.get(key)
+            if total is None:
+                merged[key] = [distance, play_count]
+                continue
+            if distance is not None:
+                total[0] = distance if total[0] is None else total[0] + distance
+            total[1] += play_count
+        
+        return [
+            (day, user_id, b_place_id, distance, play_count)
+            for (day, user_id, b_place_id), (distance, play_count) in merged.items()
+        ]
+
+def main():
+    parser = argparse.ArgumentParser(description='유산소 기록 일별 롤업 관리')
+    parser.add_argument('command', choices=['refresh', 'status'])
+    parser.add_argument('--path', default=ROLLUP_PATH, help='롤업 파일 경로 (기본: MISSION_ROLLUP_PATH)')
+    parser.add_argument('--rebuild', action='store_true', help='롤업을 비우고 처음부터 다시 집계')
+    parser.add_argument('--batch-size', type=int, default=100000, help='한 번에 집계할 기록 수')
+    args = parser.parse_args()
+    
+    rollup = DailyRollup(args.path)
+    if args.command == 'status':
+        for key, value in rollup.status().items():
+            print(f"{key}: {value}")
+        return
+    
+    db = PostgreSQLConnector()
+    if not db.connect():
+        return
+    try:
+        if args.rebuild:
+            summary = rollup.rebuild(db, args.batch_size)
+        else:
+            summary = rollup.refresh(db, args.batch_size)
+    finally:
+        db.disconnect()
+    
+    if summary is None:
+        print("❌ 롤업 갱신 실패")
+    else:
+        print(f"✅ 롤업 갱신 완료: {summary['batches']}개 배치, "
+              f"{summary['rows_merged']:,}개 행 반영 (id {summary['high_water_mark']}까지, "
+              f"늦게 커밋된 기록 {summary['late_rows']:,}개)")
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,206 @@
 import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from psycopg2.pool import PoolError
+from query_metrics import estimate_result_bytes, metrics
+from query_result import QueryResult
+import asyncio
 import csv
+import gzip
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+import itertools
 import os
+import threading
+import time
+import uuid
+import weakref
+
+# 연결마다 PREPARE한 문장 이름 (연결이 닫혀 버려지면 함께 사라짐)
+_prepared_statements = weakref.WeakKeyDictionary()
+# 문장 이름 -> PREPARE한 쿼리 ($1, $2 자리표시자) - 인덱스 추천에서 EXECUTE 기록을 다시 EXPLAIN할 때 사용
+prepared_queries = {}
+
+def like_pattern(value):
+    """부분 일치 검색용 ILIKE 패턴 ('%값%', 값 안의 %, _, \는 문자 그대로 검색)
+    
+    pg_trgm GIN 인덱스(gin_trgm_ops)가 있으면 3글자 이상 검색어는 인덱스로 찾음
+    """
+    escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+def iter_result_batches(query_result):
+    """쿼리 결과의 행 묶음을 순서대로 반환 (일반 결과는 한 묶음, 스트리밍 결과는 itersize 단위)"""
+    if isinstance(query_result, QueryResult):
+        yield from query_result.iter_batches()
+    elif 'batches' in query_result:
+        yield from query_result['batches']
+    elif query_result['data']:
+        yield query_result['data']
+
+def iter_result_rows(query_result):
+    """쿼리 결과의 행을 하나씩 반환 (일반 결과와 스트리밍 결과 모두 지원)"""
+    for batch in iter_result_batches(query_result):
+        yield from batch
+
+class _ProgressWriter:
+    """COPY 출력을 파일에 쓰면서 기록한 크기와 대략적인 행 수를 주기적으로 표시"""
+    def __init__(self, fileobj, progress_interval):
+        self.fileobj = fileobj
+        self.progress_interval = progress_interval
+        self.bytes_written = 0
+        self.lines_written = 0
+        self._next_report = progress_interval
+    
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.fileobj.write(data)
+        self.bytes_written += len(data)
+        self.lines_written += data.count(b'\n')
+        if self.progress_interval and self.bytes_written >= self._next_report:
+            print(f"⏳ {self.bytes_written / 1024 / 1024:,.1f}MB 기록 중... (약 {max(self.lines_written - 1, 0):,}행)")
+            self._next_report += self.progress_interval
+
+class ConnectionPool:
+    """스레드 안전한 PostgreSQL 커넥션 풀 (최대 연결 수 제한, 헬스체크, 유휴 연결 정리)"""
+    def __init__(self, db_config, minconn=1, maxconn=10, idle_timeout=300,
+                 health_check_interval=30, checkout_timeout=30):
+        self.db_config = db_config
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.idle_timeout = idle_timeout                    # 이 시간(초) 넘게 쉬는 연결은 정리
+        self.health_check_interval = health_check_interval  # 이 시간(초) 넘게 쉰 연결은 대여 전 확인
+        self.checkout_timeout = checkout_timeout            # 빈 연결을 기다리는 최대 시간(초)
+        
+        self._idle = deque()  # (connection, 마지막 사용 시각) - 오른쪽이 가장 최근
+        self._size = 0        # 대여 중 + 유휴 연결 수
+        self._condition = threading.Condition()
+        self._closed = False
+    
+    def _connect(self):
+        return psycopg2.connect(**self.db_config)
+    
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+    
+    def _evict_idle(self):
+        """오래 쉰 유휴 연결 정리 (minconn 개수까지는 유지, 락을 잡은 상태에서 호출)"""
+        now = time.monotonic()
+        while self._idle and self._size > self.minconn:
+            connection, last_used = self._idle[0]
+            if now - last_used < self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._close_quietly(connection)
+    
+    def _is_healthy(self, connection, last_used):
+        """대여 전 연결 상태 확인 (오래 쉰 연결만 SELECT 1로 확인)"""
+        if connection.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+    
+    def getconn(self):
+        """풀에서 연결 대여 (빈 연결이 없으면 checkout_timeout까지 대기)"""
+        deadline = time.monotonic() + self.checkout_timeout
+        connection = None
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise PoolError("커넥션 풀이 닫혔습니다.")
+                self._evict_idle()
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                    break
+                if self._size < self.maxconn:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolError(f"{self.checkout_timeout}초 안에 사용 가능한 연결이 없습니다.")
+                self._condition.wait(remaining)
+        
+        # 연결 생성과 헬스체크는 락 밖에서 수행
+        try:
+            if connection is not None:
+                if self._is_healthy(connection, last_used):
+                    return connection
+                self._close_quietly(connection)
+            return self._connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+    
+    def putconn(self, connection, close=False):
+        """대여한 연결 반납 (열린 트랜잭션은 롤백)"""
+        if not close and not connection.closed:
+            try:
+                if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except psycopg2.Error:
+                close = True
+        
+        with self._condition:
+            if close or connection.closed or self._closed:
+                self._size -= 1
+                self._close_quietly(connection)
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+    
+    def closeall(self):
+        """유휴 연결을 모두 닫고 풀 종료 (대여 중인 연결은 반납 시 닫힘)"""
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                connection, _ = self._idle.popleft()
+                self._size -= 1
+                self._close_quietly(connection)
+            self._condition.notify_all()
+    
+    def stats(self):
+        """풀 상태 (전체/유휴/대여 중 연결 수)"""
+        with self._condition:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'maxconn': self.maxconn
+            }
 
 class PostgreSQLConnector:
-    def __init__(self):
+    EXCEL_MAX_ROWS = 1048576  # Excel 시트 하나에 들어가는 최대 행 수 (헤더 포함)
+    
+    def __init__(self, pool=None):
         self.connection = None
         self.cursor = None
+        self.pool = pool
+        self.executor = None  # execute_query_async용 스레드 풀 (init_pool에서 생성)
+        self._checkout_on_demand = False  # borrow(lazy=True)로 빌린 커넥터만 True
         
-        # 데이터베이스 연결 정보
+        # 데이터베이스 연결 정보 (DB_* 환경변수로 변경 가능 - 예: 로컬 PostgreSQL로 부하 테스트)
         self.db_config = {
-            'host': 'butfitseoul-replica.cjilul7too7t.ap-northeast-2.rds.amazonaws.com',
-            'port': 5432,
-            'database': 'master_20221217',
-            'user': 'ywlee',
-            'password': 'Tha1xia5Poo0aethei0eifauz8udo4oh'
+            'host': os.environ.get('DB_HOST', 'butfitseoul-replica.cjilul7too7t.ap-northeast-2.rds.amazonaws.com'),
+            'port': int(os.environ.get('DB_PORT', 5432)),
+            'database': os.environ.get('DB_NAME', 'master_20221217'),
+            'user': os.environ.get('DB_USER', 'ywlee'),
+            'password': os.environ.get('DB_PASSWORD', 'Tha1xia5Poo0aethei0eifauz8udo4oh')
         }
     
     def connect(self):
@@ -37,27 +222,163 @@ class PostgreSQLConnector:
             self.connection.close()
         print("🔌 데이터베이스 연결이 해제되었습니다.")
     
-    def execute_query(self, query):
-        """쿼리 실행하고 결과 반환"""
+    def init_pool(self, minconn=1, maxconn=10, **pool_options):
+        """커넥션 풀 생성 (연결은 처음 필요할 때 만들어짐)"""
+        self.pool = ConnectionPool(self.db_config, minconn=minconn, maxconn=maxconn, **pool_options)
+        # 비동기 쿼리는 각자 풀에서 연결을 빌리므로 스레드 수를 풀 크기에 맞춤
+        self.executor = ThreadPoolExecutor(max_workers=maxconn, thread_name_prefix='db-query')
+        print(f"✅ 커넥션 풀이 준비되었습니다. (최대 {maxconn}개 연결)")
+        return self.pool
+    
+    def close_pool(self):
+        """커넥션 풀 종료"""
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        if self.pool:
+            self.pool.closeall()
+            self.pool = None
+            print("🔌 커넥션 풀이 종료되었습니다.")
+    
+    @contextmanager
+    def borrow(self, lazy=False):
+        """풀에서 연결을 빌려 요청 전용 커넥터로 사용하고, 블록이 끝나면 반납
+        
+        lazy=True이면 첫 쿼리를 실행할 때 연결을 빌림 (쿼리가 없으면 풀을 건드리지 않음)
+        """
+        if self.pool is None:
+            raise PoolError("커넥션 풀이 없습니다. init_pool()을 먼저 호출하세요.")
+        
+        db = PostgreSQLConnector(pool=self.pool)
+        db.db_config = self.db_config
+        db.executor = self.executor
+        db._checkout_on_demand = lazy
+        if not lazy:
+            db._checkout()
+        try:
+            yield db
+        finally:
+            db._checkin()
+    
+    def _checkout(self):
+        """풀에서 연결 대여"""
+        try:
+            self.connection = self.pool.getconn()
+        except psycopg2.Error as e:
+            print(f"❌ 데이터베이스 연결 실패: {e}")
+            if isinstance(e, PoolError):
+                raise
+            raise PoolError(str(e)) from e
+        self.cursor = self.connection.cursor()
+    
+    def _checkin(self):
+        """대여한 연결을 풀에 반납"""
+        if self.connection is None:
+            return
+        if not self.connection.closed:
+            self.cursor.close()
+        self.pool.putconn(self.connection)
+        self.connection = None
+        self.cursor = None
+    
+    async def execute_query_async(self, query, params=None):
+        """풀에서 별도 연결을 빌려 스레드 풀에서 쿼리 실행 (asyncio.gather로 여러 쿼리를 동시에 실행 가능)"""
+        return await self._run_borrowed(lambda db: db.execute_query(query, params))
+    
+    async def execute_prepared_async(self, name, query, params=()):
+        """execute_prepared의 비동기 버전 (풀에서 빌린 연결마다 한 번씩 PREPARE)"""
+        return await self._run_borrowed(lambda db: db.execute_prepared(name, query, params))
+    
+    async def _run_borrowed(self, func):
+        """풀에서 연결을 빌린 커넥터로 func를 스레드 풀에서 실행하고 바로 반납"""
+        if self.pool is None or self.executor is None:
+            raise PoolError("커넥션 풀이 없습니다. init_pool()을 먼저 호출하세요.")
+        
+        def run():
+            with self.borrow() as db:
+                return func(db)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, run)
+    
+    def execute_prepared(self, name, query, params=()):
+        """서버 측 prepared statement로 쿼리 실행 (연결마다 처음 한 번만 PREPARE해서 계획을 재사용)
+        
+        query는 $1, $2, ... 자리표시자를 사용하고 params 순서대로 값을 넘김
+        """
+        if not self.prepare(name, query):
+            return None
+        
+        if not params:
+            return self.execute_query(f"EXECUTE {name}")
+        return self.execute_query(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    
+    def prepare(self, name, query):
+        """현재 연결에 name으로 쿼리를 PREPARE (이미 준비했으면 그대로 사용, 실패 시 False)"""
+        if not self.connection and self._checkout_on_demand:
+            self._checkout()
+        if not self.connection:
+            print("❌ 데이터베이스에 연결되지 않았습니다. connect()를 먼저 호출하세요.")
+            return False
+        
+        prepared = _prepared_statements.setdefault(self.connection, set())
+        if name in prepared:
+            return True
+        
+        try:
+            self.cursor.execute(f"PREPARE {name} AS {query}")
+        except psycopg2.errors.DuplicatePreparedStatement:
+            # 이미 준비된 문장 (PREPARE는 롤백해도 남아 있음)
+            self.connection.rollback()
+        except psycopg2.Error as e:
+            print(f"❌ 쿼리 준비 실패: {e}")
+            metrics.record_query(query, 0.0, error=e)
+            try:
+                self.connection.rollback()
+            except psycopg2.Error:
+                pass
+            return False
+        
+        prepared.add(name)
+        prepared_queries[name] = query
+        return True
+    
+    def execute_query(self, query, params=None, stream=False, itersize=2000):
+        """쿼리 실행하고 결과 반환 (결과 집합이 있으면 열 단위 QueryResult)
+        
+        params를 넘기면 query의 %s / %(이름)s 자리에 값을 바인딩 (값을 쿼리 문자열에 직접 넣지 않음)
+        stream=True이면 서버 측 커서로 결과를 itersize개씩 나눠 가져옴
+        ('data' 대신 행 묶음 제너레이터 'batches'를 반환하므로 메모리 사용량이 결과 크기와 무관)
+        """
+        if not self.connection and self._checkout_on_demand:
+            self._checkout()
         if not self.connection:
             print("❌ 데이터베이스에 연결되지 않았습니다. connect()를 먼저 호출하세요.")
             return None
         
+        if stream:
+            return self._execute_streaming(query, params, itersize)
+        
+        started = time.perf_counter()
         try:
-            self.cursor.execute(query)
+            self.cursor.execute(query, params)
+            executed = time.perf_counter()
             
-            # SELECT 쿼리인 경우 결과 반환
-            if query.strip().upper().startswith('SELECT'):
+            # 결과 집합이 있는 쿼리(SELECT, WITH ... SELECT 등)인 경우 결과 반환
+            if self.cursor.description is not None:
                 columns = [desc[0] for desc in self.cursor.description]
                 rows = self.cursor.fetchall()
-                return {
-                    'columns': columns,
-                    'data': rows,
-                    'row_count': len(rows)
-                }
+                # INSERT ... RETURNING, 쓰기가 들어간 WITH 등도 결과 집합이 있으므로 가져온 뒤 항상 커밋
+                # (커밋하지 않으면 연결을 풀에 반납할 때 롤백됨)
+                self.connection.commit()
+                self._record_query(query, params, executed - started, time.perf_counter() - executed,
+                                   len(rows), estimate_result_bytes(rows))
+                return QueryResult.from_rows(columns, rows)
             else:
                 # INSERT, UPDATE, DELETE 등의 경우
                 self.connection.commit()
+                metrics.record_query(query, time.perf_counter() - started, row_count=max(self.cursor.rowcount, 0),
+                                     params=params)
                 return {
                     'message': '쿼리가 성공적으로 실행되었습니다.',
                     'affected_rows': self.cursor.rowcount
@@ -65,7 +386,95 @@ class PostgreSQLConnector:
                 
         except psycopg2.Error as e:
             print(f"❌ 쿼리 실행 실패: {e}")
+            metrics.record_query(query, time.perf_counter() - started, error=e)
+            # 실패한 트랜잭션을 정리해야 같은 연결로 다음 쿼리를 실행할 수 있음
+            try:
+                self.connection.rollback()
+            except psycopg2.Error:
+                pass
+            return None
+    
+    def _record_query(self, query, params, execute_s, fetch_s, row_count, bytes_fetched):
+        """결과를 가져온 쿼리의 측정값 기록 (느린 쿼리는 설정에 따라 실행 계획도 함께 기록)"""
+        plan = None
+        if metrics.explain_slow and metrics.is_slow(execute_s + fetch_s):
+            plan = self.explain(query, params)
+        metrics.record_query(query, execute_s, fetch_s, row_count, bytes_fetched, plan=plan, params=params)
+    
+    def explain(self, query, params=None, analyze=True, verbose=False, generic_plan=False):
+        """쿼리 실행 계획 (EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)) 조회
+        
+        ANALYZE는 쿼리를 실제로 실행하므로 끝나면 롤백해서 변경 사항이 남지 않게 함 (실패 시 None)
+        verbose=True이면 노드마다 읽은 컬럼(Output)도 포함, generic_plan=True이면 $1 자리표시자가
+        남은 쿼리의 일반 계획을 조회 (PostgreSQL 16 이상, ANALYZE와 함께 쓸 수 없음)
+        """
+        options = ["ANALYZE", "BUFFERS"] if analyze else []
+        if verbose:
+            options.append("VERBOSE")
+        if generic_plan:
+            options.append("GENERIC_PLAN")
+        options = ", ".join(options + ["FORMAT JSON"])
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN ({options}) {query.strip().rstrip(';')}", params)
+            return cursor.fetchone()[0]
+        except psycopg2.Error as e:
+            print(f"⚠️ 실행 계획 조회 실패: {e}")
+            return None
+        finally:
+            cursor.close()
+            try:
+                self.connection.rollback()
+            except psycopg2.Error:
+                pass
+    
+    def _execute_streaming(self, query, params, itersize):
+        """서버 측(named) 커서로 SELECT 쿼리 실행"""
+        cursor = None
+        started = time.perf_counter()
+        try:
+            cursor = self.connection.cursor(name=f"stream_{uuid.uuid4().hex}")
+            cursor.itersize = itersize
+            cursor.execute(query, params)
+            # named 커서는 첫 FETCH 이후에 컬럼 정보를 알 수 있음
+            first_batch = cursor.fetchmany(itersize)
+            columns = [desc[0] for desc in cursor.description]
+            executed = time.perf_counter()
+        except psycopg2.Error as e:
+            print(f"❌ 쿼리 실행 실패: {e}")
+            metrics.record_query(query, time.perf_counter() - started, error=e)
+            try:
+                self.connection.rollback()
+            except psycopg2.Error:
+                pass
             return None
+        
+        def batches():
+            # 가져오기 시간은 FETCH에 걸린 시간만 합산 (소비하는 쪽의 처리 시간 제외)
+            fetch_s = 0.0
+            row_count = 0
+            bytes_fetched = 0
+            try:
+                batch = first_batch
+                while batch:
+                    row_count += len(batch)
+                    bytes_fetched += estimate_result_bytes(batch)
+                    yield batch
+                    if len(batch) < itersize:
+                        break
+                    fetch_started = time.perf_counter()
+                    batch = cursor.fetchmany(itersize)
+                    fetch_s += time.perf_counter() - fetch_started
+            finally:
+                if not cursor.closed and not self.connection.closed:
+                    cursor.close()
+                metrics.record_query(query, executed - started, fetch_s, row_count, bytes_fetched, params=params)
+        
+        return {
+            'columns': columns,
+            'batches': batches(),
+            'streaming': True
+        }
     
     def save_to_csv(self, query_result, filename=None):
         """쿼리 결과를 CSV 파일로 저장"""
@@ -84,19 +493,106 @@ class PostgreSQLConnector:
                 # 헤더 작성
                 writer.writerow(query_result['columns'])
                 
-                # 데이터 작성
-                writer.writerows(query_result['data'])
+                # 데이터 작성 (스트리밍 결과는 묶음 단위로 바로 기록)
+                row_count = 0
+                for batch in iter_result_batches(query_result):
+                    writer.writerows(batch)
+                    row_count += len(batch)
             
             print(f"✅ CSV 파일이 저장되었습니다: {filename}")
-            print(f"📊 총 {query_result['row_count']}개의 행이 저장되었습니다.")
+            print(f"📊 총 {row_count}개의 행이 저장되었습니다.")
             return True
             
         except Exception as e:
             print(f"❌ CSV 저장 실패: {e}")
             return False
     
-    def save_to_excel(self, query_result, filename=None):
-        """쿼리 결과를 Excel 파일로 저장"""
+    def copy_to_csv(self, query, filename=None, compression=None, progress_interval=10 * 1024 * 1024):
+        """COPY ... TO STDOUT으로 쿼리 결과를 CSV 파일에 바로 기록 (결과를 메모리에 올리지 않음)
+        
+        compression: None, 'gzip', 'zstd' (지정하지 않으면 파일 확장자 .gz/.zst로 판단)
+        성공하면 {'filename', 'row_count', 'bytes_written'}, 실패하면 None 반환
+        """
+        if not self.connection and self._checkout_on_demand:
+            self._checkout()
+        if not self.connection:
+            print("❌ 데이터베이스에 연결되지 않았습니다. connect()를 먼저 호출하세요.")
+            return None
+        
+        if compression is None and filename:
+            if filename.endswith('.gz'):
+                compression = 'gzip'
+            elif filename.endswith('.zst'):
+                compression = 'zstd'
+        
+        if compression not in (None, 'gzip', 'zstd'):
+            print(f"❌ 지원하지 않는 압축 형식입니다: {compression} (gzip, zstd 중 선택)")
+            return None
+        
+        if not filename:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            extension = {None: '', 'gzip': '.gz', 'zstd': '.zst'}[compression]
+            filename = f"query_result_{timestamp}.csv{extension}"
+        
+        copy_query = f"COPY ({query.strip().rstrip(';')}) TO STDOUT WITH (FORMAT csv, HEADER true, ENCODING 'UTF8')"
+        
+        started = time.perf_counter()
+        try:
+            with open(filename, 'wb') as raw_file:
+                if compression == 'gzip':
+                    with gzip.GzipFile(fileobj=raw_file, mode='wb', compresslevel=6) as out_file:
+                        writer = _ProgressWriter(out_file, progress_interval)
+                        self.cursor.copy_expert(copy_query, writer)
+                elif compression == 'zstd':
+                    import zstandard
+                    with zstandard.ZstdCompressor(level=3).stream_writer(raw_file, closefd=False) as out_file:
+                        writer = _ProgressWriter(out_file, progress_interval)
+                        self.cursor.copy_expert(copy_query, writer)
+                else:
+                    writer = _ProgressWriter(raw_file, progress_interval)
+                    self.cursor.copy_expert(copy_query, writer)
+            
+            # COPY가 보고한 정확한 행 수 사용 (값 안의 줄바꿈과 무관)
+            row_count = self.cursor.rowcount
+            file_size = os.path.getsize(filename)
+            metrics.record_query(copy_query, time.perf_counter() - started, row_count=row_count,
+                                 bytes_fetched=writer.bytes_written)
+            
+            print(f"✅ CSV 파일이 저장되었습니다: {filename}")
+            print(f"📊 총 {row_count:,}개의 행이 저장되었습니다. (CSV {writer.bytes_written / 1024 / 1024:,.1f}MB, 파일 {file_size / 1024 / 1024:,.1f}MB)")
+            return {
+                'filename': filename,
+                'row_count': row_count,
+                'bytes_written': writer.bytes_written
+            }
+        
+        except ImportError:
+            print("❌ zstandard가 설치되지 않았습니다. 'pip install zstandard'를 실행하세요.")
+        except psycopg2.Error as e:
+            print(f"❌ CSV 저장 실패: {e}")
+            metrics.record_query(copy_query, time.perf_counter() - started, error=e)
+            try:
+                self.connection.rollback()
+            except psycopg2.Error:
+                pass
+        except Exception as e:
+            print(f"❌ CSV 저장 실패: {e}")
+        
+        # 중간에 실패하면 불완전한 파일 삭제
+        if os.path.exists(filename):
+            os.remove(filename)
+        return None
+    
+    def save_to_excel(self, query_result, filename=None, write_only=None):
+        """쿼리 결과를 Excel 파일로 저장
+        
+        write_only가 None이면 스트리밍 결과일 때 자동으로 write-only 모드(save_to_excel_streaming) 사용
+        """
+        if write_only is None:
+            write_only = bool(query_result and query_result.get('streaming'))
+        if write_only:
+            return self.save_to_excel_streaming(query_result, filename)
+        
         try:
             from openpyxl import Workbook
             from openpyxl.styles import Font, PatternFill
@@ -124,9 +620,11 @@ class PostgreSQLConnector:
                 cell.fill = header_fill
             
             # 데이터 작성
-            for row_num, row_data in enumerate(query_result['data'], 2):
+            row_count = 0
+            for row_num, row_data in enumerate(iter_result_rows(query_result), 2):
                 for col_num, value in enumerate(row_data, 1):
                     ws.cell(row=row_num, column=col_num, value=value)
+                row_count += 1
             
             # 열 너비 자동 조정
             for column in ws.columns:
@@ -143,7 +641,85 @@ class PostgreSQLConnector:
             
             wb.save(filename)
             print(f"✅ Excel 파일이 저장되었습니다: {filename}")
-            print(f"📊 총 {query_result['row_count']}개의 행이 저장되었습니다.")
+            print(f"📊 총 {row_count}개의 행이 저장되었습니다.")
+            return True
+            
+        except ImportError:
+            print("❌ openpyxl이 설치되지 않았습니다. 'pip install openpyxl'을 실행하세요.")
+            return False
+        except Exception as e:
+            print(f"❌ Excel 저장 실패: {e}")
+            return False
+    
+    def save_to_excel_streaming(self, query_result, filename=None, sample_size=1000):
+        """쿼리 결과를 write-only 모드 Excel 파일로 저장 (시트 전체를 메모리에 만들지 않음)
+        
+        열 너비는 앞쪽 sample_size개 행으로 추정하고, 시트가 Excel 최대 행 수에 도달하면 새 시트로 이어서 기록
+        """
+        try:
+            from openpyxl import Workbook
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.styles import Font, PatternFill
+            from openpyxl.utils import get_column_letter
+            
+            if not query_result or 'columns' not in query_result:
+                print("❌ 저장할 데이터가 없습니다.")
+                return False
+            
+            if not filename:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"query_result_{timestamp}.xlsx"
+            
+            columns = query_result['columns']
+            rows = iter_result_rows(query_result)
+            
+            # 열 너비 추정용 샘플 (write-only 시트는 행을 쓰기 전에 너비를 정해야 함)
+            sample = list(itertools.islice(rows, sample_size))
+            widths = []
+            for col_num, column in enumerate(columns):
+                max_length = max(
+                    [len(str(column))] + [len(str(row[col_num])) for row in sample if row[col_num] is not None]
+                )
+                widths.append(min(max_length + 2, 50))
+            
+            wb = Workbook(write_only=True)
+            header_font = Font(bold=True, color="FFFFFF")
+            header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+            
+            def create_sheet(sheet_number):
+                title = "Query Result" if sheet_number == 1 else f"Query Result ({sheet_number})"
+                ws = wb.create_sheet(title)
+                for col_num, width in enumerate(widths, 1):
+                    ws.column_dimensions[get_column_letter(col_num)].width = width
+                
+                header = []
+                for column in columns:
+                    cell = WriteOnlyCell(ws, value=column)
+                    cell.font = header_font
+                    cell.fill = header_fill
+                    header.append(cell)
+                ws.append(header)
+                return ws
+            
+            sheet_count = 1
+            ws = create_sheet(sheet_count)
+            sheet_rows = 1
+            row_count = 0
+            
+            for row in itertools.chain(sample, rows):
+                if sheet_rows >= self.EXCEL_MAX_ROWS:
+                    sheet_count += 1
+                    ws = create_sheet(sheet_count)
+                    sheet_rows = 1
+                ws.append(row)
+                sheet_rows += 1
+                row_count += 1
+            
+            wb.save(filename)
+            print(f"✅ Excel 파일이 저장되었습니다: {filename}")
+            print(f"📊 총 {row_count}개의 행이 저장되었습니다.")
+            if sheet_count > 1:
+                print(f"📑 시트당 최대 행 수를 넘어 {sheet_count}개 시트로 나눠 저장했습니다.")
             return True
             
         except ImportError:
@@ -153,6 +729,86 @@ class PostgreSQLConnector:
             print(f"❌ Excel 저장 실패: {e}")
             return False
     
+    def save_to_parquet(self, query_result, filename=None):
+        """쿼리 결과를 Parquet 파일로 저장 (스트리밍 결과는 묶음 단위로 기록)
+        
+        열 형식을 유지하므로 load_parquet으로 읽으면 DB에서 받은 값과 같은 타입(Decimal 등)으로 돌아옴
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            
+            if not query_result or 'columns' not in query_result:
+                print("❌ 저장할 데이터가 없습니다.")
+                return False
+            
+            if not filename:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"query_result_{timestamp}.parquet"
+            
+            if isinstance(query_result, QueryResult):
+                # 열 배열을 그대로 Arrow 배열로 넘김 (문자열 열은 사전 인코딩 유지)
+                pq.write_table(query_result.to_arrow(), filename)
+                print(f"✅ Parquet 파일이 저장되었습니다: {filename}")
+                print(f"📊 총 {len(query_result)}개의 행이 저장되었습니다.")
+                return True
+            
+            columns = query_result['columns']
+            writer = None
+            row_count = 0
+            try:
+                for batch in iter_result_batches(query_result):
+                    table = pa.Table.from_arrays([pa.array(values) for values in zip(*batch)], names=columns)
+                    if writer is None:
+                        # 첫 묶음으로 정한 형식을 이후 묶음에도 맞춤 (전부 NULL인 열은 문자열, 소수는 최대 자릿수)
+                        fields = []
+                        for field in table.schema:
+                            if pa.types.is_null(field.type):
+                                field = field.with_type(pa.string())
+                            elif pa.types.is_decimal(field.type):
+                                field = field.with_type(pa.decimal128(38, field.type.scale))
+                            fields.append(field)
+                        writer = pq.ParquetWriter(filename, pa.schema(fields))
+                    writer.write_table(table.cast(writer.schema))
+                    row_count += len(batch)
+                
+                if writer is None:
+                    # 결과가 없어도 열 이름은 남김
+                    pq.write_table(pa.table({column: pa.array([], pa.string()) for column in columns}), filename)
+            finally:
+                if writer is not None:
+                    writer.close()
+            
+            print(f"✅ Parquet 파일이 저장되었습니다: {filename}")
+            print(f"📊 총 {row_count}개의 행이 저장되었습니다.")
+            return True
+            
+        except ImportError:
+            print("❌ pyarrow가 설치되지 않았습니다. 'pip install pyarrow'를 실행하세요.")
+            return False
+        except Exception as e:
+            print(f"❌ Parquet 저장 실패: {e}")
+            return False
+    
+    def load_parquet(self, filename, memory_map=True):
+        """save_to_parquet으로 저장한 파일을 execute_query와 같은 형태의 결과로 읽기 (DB 연결 불필요)
+        
+        memory_map=True이면 파일을 메모리 맵으로 열어 읽기 위해 복사하지 않음
+        (NULL 없는 숫자 열은 메모리 맵을 그대로 가리키는 배열로, 사전 인코딩 열은 코드 그대로 읽음)
+        """
+        try:
+            import pyarrow.parquet as pq
+            
+            table = pq.read_table(filename, memory_map=memory_map)
+            return QueryResult.from_arrow(table)
+            
+        except ImportError:
+            print("❌ pyarrow가 설치되지 않았습니다. 'pip install pyarrow'를 실행하세요.")
+            return None
+        except Exception as e:
+            print(f"❌ Parquet 읽기 실패: {e}")
+            return None
+    
     def get_table_list(self):
         """데이터베이스의 테이블 목록 조회"""
         query = """
@@ -165,12 +821,12 @@ class PostgreSQLConnector:
     
     def get_table_info(self, table_name):
         """특정 테이블의 컬럼 정보 조회"""
-        query = f"""
+        query = """
         SELECT column_name, data_type, is_nullable, column_default
         FROM information_schema.columns
-        WHERE table_name = '{table_name}'
+        WHERE table_name = %s
         ORDER BY ordinal_position;
         """
-        return self.execute_query(query)
+        return self.execute_query(query, (table_name,))
 
 
@@ -1,13 +1,99 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from db_connector import PostgreSQLConnector
-from datetime import datetime
+from db_connector import PostgreSQLConnector, iter_result_batches, iter_result_rows, like_pattern
+from index_advisor import IndexAdvisor
+from query_result import QueryResult
+from datetime import date, datetime
 import json
 import os
 import webbrowser
 
+def _serialize_value(value):
+    """값 하나를 JSON으로 쓸 수 있는 값으로 변환"""
+    if value is None or isinstance(value, str):
+        return value
+    if hasattr(value, 'isoformat'):  # datetime, date 객체
+        return value.isoformat()
+    return str(value)
+
+def _value_serializer(values):
+    """열 값의 변환 함수 (변환이 필요 없으면 None)
+    
+    열의 값이 모두 같은 타입(과 None)이면 첫 번째 값으로 정한 변환 함수를, 타입이 섞여 있으면 값마다 타입을 보는 함수를 반환
+    """
+    sample = next((value for value in values if value is not None), None)
+    if sample is None:
+        return None
+    sample_type = type(sample)
+    if not all(value is None or type(value) is sample_type for value in values):
+        return _serialize_value
+    if sample_type is str:
+        return None
+    if hasattr(sample, 'isoformat'):  # datetime, date 객체
+        return lambda value: None if value is None else value.isoformat()
+    return lambda value: None if value is None else str(value)
+
+def serialize_rows(rows):
+    """행 목록을 JSON으로 쓸 수 있는 값으로 변환 (열마다 변환 함수를 한 번 정해서 열 단위로 일괄 변환)
+    
+    날짜/시간은 isoformat 문자열, 문자열과 None은 그대로, 그 외 값(Decimal 등)은 str로 변환
+    QueryResult는 열의 고유값만 변환한 뒤 코드로 펼침 (같은 날짜, 지점명 등을 행마다 다시 변환하지 않음)
+    """
+    if not len(rows):
+        return []
+    
+    columns = []
+    if isinstance(rows, QueryResult):
+        for index in range(len(rows.columns)):
+            kind = rows.kind(index)
+            if kind == 'object':
+                values = rows.column_values(index)
+                convert = _value_serializer(values)
+                columns.append(values if convert is None else [convert(value) for value in values])
+                continue
+            if kind == 'str':
+                labels, codes = rows.labels(index), rows.array(index)
+            else:
+                labels, codes = rows.factorize(index)
+            convert = _value_serializer(labels)
+            if convert is not None:
+                labels = [convert(label) for label in labels]
+            columns.append([labels[code] for code in codes.tolist()])
+    else:
+        for values in zip(*rows):
+            convert = _value_serializer(values)
+            columns.append(values if convert is None else [convert(value) for value in values])
+    
+    return [list(row) for row in zip(*columns)]
+
 class DatabaseQueryTool:
+    # 내보내기 쿼리는 서버 측 커서로 이 개수만큼씩 나눠서 가져옴
+    STREAM_ITERSIZE = 2000
+    
+    # 사용자 멤버십 현황 조회 쿼리 (간단한 정보만)
+    # 검색어는 바인딩 값으로 넘기고, 부분 일치는 pg_trgm 인덱스를 쓸 수 있는 ILIKE '%...%' 패턴 사용
+    MEMBERSHIP_QUERY = """
+    SELECT 
+        u.name as 사용자이름,
+        u.phone_number as 폰번호,
+        bp_place.name as 이용지점,
+        bm.title as 멤버십명,
+        bm.begin_date as 시작일,
+        bm.end_date as 종료일,
+        CASE 
+            WHEN bm.is_active = true THEN '활성'
+            ELSE '비활성'
+        END as 상태
+    FROM user_user u
+    LEFT JOIN b_class_bpass bp ON u.id = bp.user_id
+    LEFT JOIN b_class_bmembership bm ON bp.id = bm.b_pass_id
+    LEFT JOIN b_class_bplace bp_place ON bp.b_place_id = bp_place.id
+    WHERE u.name ILIKE %s
+    AND u.phone_number ILIKE %s
+    ORDER BY bm.begin_date DESC NULLS LAST;
+    """
+    
     def __init__(self):
         self.db = PostgreSQLConnector()
         self.saved_queries = {}
@@ -49,7 +135,7 @@ class DatabaseQueryTool:
             print(f"{'테이블명':40} | {'타입'}")
             print("-" * 60)
             
-            for table_name, table_type in result['data']:
+            for table_name, table_type in result:
                 print(f"{table_name:40} | {table_type}")
         else:
             print("❌ 테이블 목록을 가져올 수 없습니다.")
@@ -72,7 +158,7 @@ class DatabaseQueryTool:
             print(f"{'컬럼명':25} | {'타입':20} | {'NULL허용':10} | {'기본값'}")
             print("-" * 80)
             
-            for col_name, data_type, is_nullable, default_val in result['data']:
+            for col_name, data_type, is_nullable, default_val in result:
                 default_str = str(default_val) if default_val else "없음"
                 print(f"{col_name:25} | {data_type:20} | {is_nullable:10} | {default_str}")
         else:
@@ -102,11 +188,11 @@ class DatabaseQueryTool:
             print("-" * 120)
             
             # 데이터 출력 (최대 20행)
-            for i, row in enumerate(result['data'][:20]):
+            for i, row in enumerate(result[:20]):
                 print(" | ".join(f"{str(val):15}" for val in row))
             
-            if len(result['data']) > 20:
-                print(f"... 그리고 {len(result['data']) - 20}개 행 더")
+            if len(result) > 20:
+                print(f"... 그리고 {len(result) - 20}개 행 더")
             
             return result
         elif result and 'message' in result:
@@ -127,22 +213,10 @@ class DatabaseQueryTool:
             spreadsheet_name = f"쿼리결과_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
         headers = data['columns']
-        rows = data['data']
-        
-        # 날짜 객체를 문자열로 변환
-        def convert_to_serializable(obj):
-            if hasattr(obj, 'isoformat'):  # datetime, date 객체
-                return obj.isoformat()
-            elif obj is None:
-                return None
-            else:
-                return str(obj)
+        rows = data if isinstance(data, QueryResult) else list(iter_result_rows(data))
         
         # 모든 데이터를 직렬화 가능한 형태로 변환
-        serializable_rows = []
-        for row in rows:
-            serializable_row = [convert_to_serializable(cell) for cell in row]
-            serializable_rows.append(serializable_row)
+        serializable_rows = serialize_rows(rows)
         
         headers_js = json.dumps(headers, ensure_ascii=False)
         data_js = json.dumps(serializable_rows, ensure_ascii=False)
@@ -186,6 +260,152 @@ function main() {{
         
         return appscript_code, spreadsheet_name
     
+    def export_query_to_appscript_chunked(self, query, spreadsheet_name=None, chunk_size=5000):
+        """쿼리 결과를 여러 개의 Apps Script 파일로 나눠서 내보내기 (대용량 결과용)
+        
+        chunk_size개 행마다 데이터 파일(Data_0001.js, ...)을 하나씩 만들고,
+        작은 로더 파일(Loader.js)이 데이터 파일을 차례로 읽어 묶음 단위로 setValues를 호출함
+        """
+        print("📊 쿼리 결과를 Apps Script 파일로 나눠서 내보내기...")
+        
+        result = self.db.execute_query(query, stream=True, itersize=self.STREAM_ITERSIZE)
+        
+        if not result or 'columns' not in result:
+            print("❌ 내보낼 데이터가 없습니다.")
+            return None
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if not spreadsheet_name:
+            spreadsheet_name = f"쿼리결과_{timestamp}"
+        
+        output_dir = f"query_result_{timestamp}_appscript"
+        
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            
+            # 결과를 chunk_size개씩 모아서 데이터 파일로 기록 (메모리에는 한 묶음만 유지)
+            chunk_count = 0
+            row_count = 0
+            pending = []
+            
+            def write_chunk(rows):
+                function_name = f"queryResultChunk_{chunk_count:04d}"
+                data_js = json.dumps(serialize_rows(rows), ensure_ascii=False)
+                with open(os.path.join(output_dir, f"Data_{chunk_count:04d}.js"), 'w', encoding='utf-8') as f:
+                    f.write(f"// {spreadsheet_name} 데이터 {chunk_count}번 ({len(rows)}행)\n")
+                    f.write(f"function {function_name}() {{\n  return {data_js};\n}}\n")
+            
+            for batch in iter_result_batches(result):
+                pending.extend(batch)
+                while len(pending) >= chunk_size:
+                    chunk_count += 1
+                    write_chunk(pending[:chunk_size])
+                    row_count += chunk_size
+                    del pending[:chunk_size]
+            if pending:
+                chunk_count += 1
+                write_chunk(pending)
+                row_count += len(pending)
+            
+            loader_code = self.generate_appscript_loader(result['columns'], spreadsheet_name, chunk_count, timestamp)
+            with open(os.path.join(output_dir, "Loader.js"), 'w', encoding='utf-8') as f:
+                f.write(loader_code)
+        
+        except Exception as e:
+            print(f"❌ 파일 저장 실패: {e}")
+            return None
+        
+        print(f"✅ Apps Script 파일이 저장되었습니다: {output_dir}/ (로더 1개, 데이터 {chunk_count}개, 총 {row_count}행)")
+        print(f"\n📋 다음 단계를 따라하세요:")
+        print(f"1. https://script.google.com/ 에서 새 프로젝트 생성")
+        print(f"2. '{output_dir}' 폴더의 Loader.js와 모든 Data_*.js 파일을 각각 스크립트 파일로 추가")
+        print(f"3. Loader의 'main' 함수 실행 (실행 시간 제한으로 중단되면 'main'을 다시 실행하면 이어서 기록)")
+        print(f"4. '{spreadsheet_name}' 스프레드시트가 자동 생성됩니다!")
+        
+        return output_dir
+    
+    def generate_appscript_loader(self, headers, spreadsheet_name, chunk_count, export_id):
+        """분할 내보내기용 로더 Apps Script 코드 생성"""
+        headers_js = json.dumps(headers, ensure_ascii=False)
+        spreadsheet_name_js = json.dumps(spreadsheet_name, ensure_ascii=False)
+        chunk_functions = ', '.join(f"queryResultChunk_{index:04d}" for index in range(1, chunk_count + 1))
+        
+        return f"""
+// 분할 내보내기 로더 - Data_*.js 파일의 데이터를 차례로 시트에 기록
+const SPREADSHEET_NAME = {spreadsheet_name_js};
+const HEADERS = {headers_js};
+const CHUNK_COUNT = {chunk_count};
+const EXPORT_ID = 'queryResult_{export_id}';
+const MAX_RUNTIME_MS = 5 * 60 * 1000;  // Apps Script 실행 시간 제한(6분) 전에 멈추고 진행 상황 저장
+
+function createQueryResultSheet() {{
+  const startTime = Date.now();
+  const props = PropertiesService.getScriptProperties();
+  const chunks = [{chunk_functions}];  // Data_*.js 파일에 정의된 데이터 함수
+  
+  // 이전 실행에서 중단된 경우 같은 스프레드시트에 이어서 기록
+  let spreadsheetId = props.getProperty(EXPORT_ID + '_spreadsheetId');
+  let spreadsheet;
+  if (spreadsheetId) {{
+    spreadsheet = SpreadsheetApp.openById(spreadsheetId);
+  }} else {{
+    spreadsheet = SpreadsheetApp.create(SPREADSHEET_NAME);
+    const headerSheet = spreadsheet.getActiveSheet();
+    
+    // 헤더 설정 및 스타일링
+    const headerRange = headerSheet.getRange(1, 1, 1, HEADERS.length);
+    headerRange.setValues([HEADERS]);
+    headerRange.setBackground('#366092');
+    headerRange.setFontColor('#FFFFFF');
+    headerRange.setFontWeight('bold');
+    
+    props.setProperty(EXPORT_ID + '_spreadsheetId', spreadsheet.getId());
+    props.setProperty(EXPORT_ID + '_nextChunk', '1');
+    props.setProperty(EXPORT_ID + '_nextRow', '2');
+  }}
+  
+  const sheet = spreadsheet.getSheets()[0];
+  let nextChunk = parseInt(props.getProperty(EXPORT_ID + '_nextChunk'), 10);
+  let nextRow = parseInt(props.getProperty(EXPORT_ID + '_nextRow'), 10);
+  
+  // 데이터 파일 하나씩 setValues로 기록
+  while (nextChunk <= CHUNK_COUNT) {{
+    if (Date.now() - startTime > MAX_RUNTIME_MS) {{
+      console.log((nextChunk - 1) + '/' + CHUNK_COUNT + '개 기록 완료. main을 다시 실행하면 이어서 기록합니다.');
+      return spreadsheet.getUrl();
+    }}
+    
+    const rows = chunks[nextChunk - 1]();
+    if (rows.length > 0) {{
+      sheet.getRange(nextRow, 1, rows.length, HEADERS.length).setValues(rows);
+      nextRow += rows.length;
+    }}
+    nextChunk += 1;
+    
+    SpreadsheetApp.flush();
+    props.setProperty(EXPORT_ID + '_nextChunk', String(nextChunk));
+    props.setProperty(EXPORT_ID + '_nextRow', String(nextRow));
+  }}
+  
+  // 열 너비 자동 조정
+  sheet.autoResizeColumns(1, HEADERS.length);
+  
+  props.deleteProperty(EXPORT_ID + '_spreadsheetId');
+  props.deleteProperty(EXPORT_ID + '_nextChunk');
+  props.deleteProperty(EXPORT_ID + '_nextRow');
+  
+  // 스프레드시트 URL 출력
+  console.log('스프레드시트 URL: ' + spreadsheet.getUrl());
+  
+  return spreadsheet.getUrl();
+}}
+
+// 실행 함수
+function main() {{
+  return createQueryResultSheet();
+}}
+"""
+    
     def save_appscript_file(self, appscript_code, filename=None):
         """Apps Script 코드를 파일로 저장"""
         if not filename:
@@ -211,13 +431,13 @@ function main() {{
         except Exception as e:
             print(f"❌ 브라우저 열기 실패: {e}")
     
-    def export_query_to_appscript(self, query, spreadsheet_name=None):
+    def export_query_to_appscript(self, query, spreadsheet_name=None, params=None):
         """쿼리 결과를 Apps Script로 내보내기"""
         print("📊 쿼리 결과를 Apps Script로 내보내기...")
         
-        result = self.db.execute_query(query)
+        result = self.db.execute_query(query, params, stream=True, itersize=self.STREAM_ITERSIZE)
         
-        if not result or 'data' not in result:
+        if not result or 'columns' not in result:
             print("❌ 내보낼 데이터가 없습니다.")
             return None
         
@@ -247,9 +467,9 @@ function main() {{
         """쿼리 결과를 Excel 파일로 저장"""
         print("📊 쿼리 결과를 Excel로 저장합니다...")
         
-        result = self.db.execute_query(query)
+        result = self.db.execute_query(query, stream=True, itersize=self.STREAM_ITERSIZE)
         
-        if result and 'data' in result:
+        if result and 'columns' in result:
             if not filename:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 filename = f"query_result_{timestamp}.xlsx"
@@ -265,6 +485,16 @@ function main() {{
             print("❌ 저장할 데이터가 없습니다.")
             return None
     
+    def save_to_csv(self, query, filename=None, compression=None):
+        """쿼리 결과를 CSV 파일로 저장 (COPY로 DB에서 파일로 바로 기록, gzip/zstd 압축 지원)"""
+        print("📊 쿼리 결과를 CSV로 저장합니다...")
+        
+        result = self.db.copy_to_csv(query, filename, compression)
+        
+        if result:
+            return result['filename']
+        return None
+    
     def save_query(self, name, query):
         """쿼리 저장"""
         self.saved_queries[name] = query
@@ -309,31 +539,12 @@ function main() {{
         
         print(f"\n🔍 '{user_name}' (폰번호: {phone_number}) 사용자의 멤버십 현황을 조회합니다...")
         
-        # 사용자 멤버십 현황 조회 쿼리 (간단한 정보만)
-        query = f"""
-        SELECT 
-            u.name as 사용자이름,
-            u.phone_number as 폰번호,
-            bp_place.name as 이용지점,
-            bm.title as 멤버십명,
-            bm.begin_date as 시작일,
-            bm.end_date as 종료일,
-            CASE 
-                WHEN bm.is_active = true THEN '활성'
-                ELSE '비활성'
-            END as 상태
-        FROM user_user u
-        LEFT JOIN b_class_bpass bp ON u.id = bp.user_id
-        LEFT JOIN b_class_bmembership bm ON bp.id = bm.b_pass_id
-        LEFT JOIN b_class_bplace bp_place ON bp.b_place_id = bp_place.id
-        WHERE u.name ILIKE '%{user_name}%' 
-        AND u.phone_number ILIKE '%{phone_number}%'
-        ORDER BY bm.begin_date DESC NULLS LAST;
-        """
+        query = self.MEMBERSHIP_QUERY
+        params = (like_pattern(user_name), like_pattern(phone_number))
         
-        result = self.db.execute_query(query)
+        result = self.db.execute_query(query, params)
         
-        if result and 'data' in result and result['data']:
+        if result and 'data' in result and len(result):
             print(f"\n📊 조회 결과: {result['row_count']}개의 멤버십")
             print("-" * 100)
             
@@ -343,7 +554,7 @@ function main() {{
             print("-" * 100)
             
             # 데이터 출력
-            for i, row in enumerate(result['data']):
+            for i, row in enumerate(result):
                 print(" | ".join(f"{str(val):15}" for val in row))
             
             # Apps Script로 내보내기 옵션 제공
@@ -353,7 +564,7 @@ function main() {{
                 if not spreadsheet_name:
                     spreadsheet_name = f"{user_name}_멤버십현황_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
                 
-                filename = self.export_query_to_appscript(query, spreadsheet_name)
+                filename = self.export_query_to_appscript(query, spreadsheet_name, params)
                 if filename:
                     print(f"✅ Apps Script 파일이 생성되었습니다: {filename}")
             
@@ -362,6 +573,57 @@ function main() {{
             print("❌ 해당 사용자의 멤버십 정보를 찾을 수 없습니다.")
             return None
 
+    def advise_indexes(self, year=None, month=None, trial=False, keep=False):
+        """도구가 실행하는 쿼리들의 실행 계획을 보고 인덱스 추천 (DDL 파일 저장)
+        
+        대상: 이번 실행에서 쓴 쿼리, 월간미션 쿼리(year년 month월 목표 계산 기준), 멤버십 조회, pg_stat_statements
+        trial=True이면 인덱스를 만들어 보고 전후 실행 시간을 비교 (keep=False이면 다시 삭제)
+        """
+        # 월간미션 쿼리 문장만 가져오면 되므로 이 메뉴를 쓸 때만 불러옴 (Flask 앱 모듈)
+        from monthly_mission_calculator import MonthlyMissionCalculator
+        
+        print("\n🧭 인덱스 추천")
+        print("=" * 40)
+        
+        advisor = IndexAdvisor(self.db)
+        workload = advisor.session_workload()
+        
+        if not year or not month:
+            today = date.today()
+            year, month = today.year, today.month
+        calculator = MonthlyMissionCalculator(db=self.db)
+        month_range = calculator.get_previous_month_range(year, month)
+        # /api/calculate/range처럼 석 달을 한 번에 조회하는 경우
+        range_start = calculator.get_previous_month_range(*calculator.shift_month(year, month, -2))[0]
+        workload += [
+            {
+                'label': f"월간미션 사용자별 일별 데이터 ({month_range[0]}~)",
+                'query': "EXECUTE previous_month_data (%s, %s)",
+                'params': month_range,
+                'prepared': ('previous_month_data', calculator.previous_month_query())
+            },
+            {
+                'label': f"월간미션 지점별 요일별 데이터 ({month_range[0]}~)",
+                'query': "EXECUTE branch_weekday_data (%s, %s)",
+                'params': month_range,
+                'prepared': ('branch_weekday_data', calculator.branch_weekday_query())
+            },
+            {
+                'label': f"월간미션 기간 통합 조회 ({range_start}~{month_range[1]})",
+                'query': "EXECUTE combined_range_data (%s, %s)",
+                'params': (range_start, month_range[1]),
+                'prepared': ('combined_range_data', calculator.combined_range_query())
+            },
+            {
+                'label': "사용자 멤버십 조회",
+                'query': self.MEMBERSHIP_QUERY,
+                'params': (like_pattern('김'), like_pattern('1234'))
+            }
+        ]
+        workload += advisor.stat_statements_workload()
+        
+        return advisor.advise(workload, trial=trial, keep=keep)
+
 def main():
     print("🗄️ PostgreSQL 데이터베이스 쿼리 도구")
     print("=" * 50)
@@ -383,9 +645,12 @@ def main():
             print("7. 새 쿼리 저장")
             print("8. 저장된 쿼리 실행")
             print("9. 사용자 멤버십 현황 조회")
-            print("10. 종료")
+            print("10. 쿼리 결과를 CSV로 저장")
+            print("11. 쿼리 결과를 Apps Script로 나눠서 내보내기 (대용량)")
+            print("12. 인덱스 추천 (실행 계획 분석)")
+            print("13. 종료")
             
-            choice = input("\n선택하세요 (1-10): ").strip()
+            choice = input("\n선택하세요 (1-13): ").strip()
             
             if choice == '1':
                 tool.get_table_list()
@@ -435,20 +700,66 @@ def main():
                 result = tool.run_saved_query(name)
                 if result and 'columns' in result:
                     print(f"\n📊 결과: {result['row_count']}개 행")
-                    for i, row in enumerate(result['data'][:5]):
+                    for i, row in enumerate(result[:5]):
                         print(" | ".join(str(val) for val in row))
-                    if len(result['data']) > 5:
-                        print(f"... 그리고 {len(result['data']) - 5}개 행 더")
+                    if len(result) > 5:
+                        print(f"... 그리고 {len(result) - 5}개 행 더")
             
             elif choice == '9':
                 tool.get_user_membership_info()
             
             elif choice == '10':
+                print("CSV로 저장할 쿼리를 입력하세요:")
+                query = input("SQL> ").strip()
+                
+                if query:
+                    filename = input("파일명 (엔터시 자동생성): ").strip()
+                    if not filename:
+                        filename = None
+                    
+                    compression = input("압축 형식 (gzip/zstd, 엔터시 압축 안 함): ").strip().lower()
+                    if not compression:
+                        compression = None
+                    
+                    tool.save_to_csv(query, filename, compression)
+            
+            elif choice == '11':
+                print("Apps Script로 내보낼 쿼리를 입력하세요:")
+                query = input("SQL> ").strip()
+                
+                if query:
+                    spreadsheet_name = input("스프레드시트 이름 (엔터시 자동생성): ").strip()
+                    if not spreadsheet_name:
+                        spreadsheet_name = None
+                    
+                    chunk_size = input("파일당 행 수 (엔터시 5000): ").strip()
+                    chunk_size = int(chunk_size) if chunk_size.isdigit() and int(chunk_size) > 0 else 5000
+                    
+                    tool.export_query_to_appscript_chunked(query, spreadsheet_name, chunk_size)
+            
+            elif choice == '12':
+                target = input("미션 계산 연월 (YYYY-MM, 엔터시 이번 달): ").strip()
+                year = month = None
+                if target:
+                    try:
+                        year, month = (int(value) for value in target.split('-'))
+                    except ValueError:
+                        print("❌ YYYY-MM 형식으로 입력하세요.")
+                        continue
+                
+                trial = input("인덱스를 만들어 보고 전후 시간을 비교할까요? (쓰기 권한 필요, y/n): ").strip().lower() == 'y'
+                keep = False
+                if trial:
+                    keep = input("비교 후 인덱스를 남겨둘까요? (y/n): ").strip().lower() == 'y'
+                
+                tool.advise_indexes(year, month, trial, keep)
+            
+            elif choice == '13':
                 print("👋 프로그램을 종료합니다.")
                 break
             
             else:
-                print("❌ 잘못된 선택입니다. 1-10 중에서 선택하세요.")
+                print("❌ 잘못된 선택입니다. 1-13 중에서 선택하세요.")
     
     finally:
         tool.disconnect()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# gunicorn 설정 - 실행: gunicorn -c gunicorn.conf.py "monthly_mission_calculator:create_app()"
+#
+# 요청 대부분이 DB 집계 쿼리를 기다리는 시간이므로 프로세스 수는 적게, 스레드(gthread)는 넉넉하게 둠
+# 모든 값은 환경변수로 조정 가능
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+
+# 워커 프로세스 수 (CPU 코어 수 기준, 최대 4개)
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 4)))
+
+# 워커당 스레드 수 - 워커마다 같은 수의 DB 연결을 풀에 둠
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+os.environ.setdefault('DB_POOL_MAX', str(threads))
+
+# 한 달치 집계 쿼리가 기본 제한(30초)을 넘을 수 있으므로 넉넉하게 설정
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# 앱을 마스터에서 한 번만 로드한 뒤 fork (워커 시작이 빠르고 메모리를 공유)
+preload_app = True
+
+# 메모리 누수 대비 워커 주기적 재시작 (동시에 재시작되지 않도록 jitter)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = 100
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """워커마다 커넥션 풀을 새로 만듦 (fork 전에 만든 풀/연결을 워커끼리 공유하지 않도록)
+    
+    MISSION_PRECOMPUTE=1이면 목표 미리 계산 스레드도 워커마다 시작 (스레드는 fork 후에 만들어야 함,
+    계산은 MISSION_CACHE_DIR의 잠금 파일을 가진 워커 하나만 함)
+    """
+    from monthly_mission_calculator import init_db_pool, start_precompute_scheduler
+    init_db_pool()
+    start_precompute_scheduler()
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""실행 계획을 보고 인덱스 추천 (db_query_tool.py의 '인덱스 추천' 메뉴)
+
+- 대상 쿼리: 이 프로세스에서 실행한 쿼리(query_metrics), 도구가 기본으로 쓰는 쿼리,
+  pg_stat_statements에 기록된 쿼리 (확장이 설치된 경우, $1 자리표시자가 남은 쿼리는 PostgreSQL 16 이상)
+- EXPLAIN (VERBOSE)에서 순차 스캔(Seq Scan)의 필터 조건과 위쪽 노드가 쓰는 컬럼을 찾아서
+  범위 조건 → 커버링 B-tree (INCLUDE) / BRIN (물리 순서와 상관관계가 높은 큰 테이블),
+  ILIKE '%...%' → pg_trgm GIN, 같음 조건 → B-tree 인덱스 DDL을 만듦
+- 시험 모드는 인덱스를 실제로 만들어 전후 실행 시간을 비교한 뒤 삭제
+  (쓰기 권한 필요, 읽기 전용 복제본에서는 DDL 파일만 저장)
+"""
+
+from db_connector import prepared_queries
+from query_metrics import metrics, query_fingerprint
+from datetime import datetime
+import re
+
+# 이보다 작은 테이블은 순차 스캔이 더 빠르므로 추천하지 않음
+MIN_TABLE_ROWS = 10000
+# BRIN을 추천할 최소 크기(페이지)와 컬럼 값-물리 순서 상관관계
+BRIN_MIN_PAGES = 1000
+BRIN_MIN_CORRELATION = 0.9
+# 커버링 인덱스의 INCLUDE 컬럼 최대 개수 (넘으면 키 컬럼만으로 만듦)
+MAX_INCLUDE_COLUMNS = 6
+
+_EXPLAINABLE_PATTERN = re.compile(r"^\s*(SELECT|WITH|EXECUTE)\b", re.IGNORECASE)
+_EXECUTE_PATTERN = re.compile(r"^\s*EXECUTE\s+(\w+)", re.IGNORECASE)
+# 카탈로그 조회(추천 도구 자신이 실행한 쿼리 포함)는 대상에서 제외
+_CATALOG_PATTERN = re.compile(r"\b(pg_catalog|information_schema|pg_stat\w*|pg_class|pg_stats|pg_indexes|pg_extension)\b",
+                              re.IGNORECASE)
+_SIMPLE_IDENTIFIER = re.compile(r"[a-z_][a-z0-9_]*")
+
+def _ident(name):
+    """SQL 식별자 (소문자/숫자/_ 이외의 문자가 있으면 따옴표로 감쌈)"""
+    if _SIMPLE_IDENTIFIER.fullmatch(name):
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+def iter_plan_nodes(node):
+    """실행 계획 노드를 위에서부터 차례로 반환"""
+    yield node
+    for child in node.get('Plans', []):
+        yield from iter_plan_nodes(child)
+
+def _node_texts(node, skip_output=False):
+    """노드의 조건/출력/정렬 키 등 문자열 값 목록"""
+    texts = []
+    for key, value in node.items():
+        if key == 'Plans' or (skip_output and key == 'Output'):
+            continue
+        if isinstance(value, str):
+            texts.append(value)
+        elif isinstance(value, list):
+            texts.extend(item for item in value if isinstance(item, str))
+    return texts
+
+def _filter_columns(alias, operator, condition):
+    """필터 조건에서 상수/자리표시자와 operator로 비교하는 컬럼 목록"""
+    pattern = re.compile(
+        rf"\(?{alias}\.(\w+)\)?(?:::[\w ]+?)?\s+{operator}\s+(?:'|\$\d|-?\d)"
+    )
+    return sorted(set(pattern.findall(condition)))
+
+def find_seq_scans(plan):
+    """EXPLAIN (VERBOSE, FORMAT JSON) 결과의 순차 스캔 목록
+    
+    [{'schema', 'table', 'range', 'ilike', 'equal', 'columns'}] - range/ilike/equal은 필터에서 찾은 컬럼,
+    columns는 계획 전체에서 이 테이블로부터 읽어 쓰는 컬럼
+    """
+    nodes = list(iter_plan_nodes(plan[0]['Plan']))
+    single_relation = len({node['Relation Name'] for node in nodes if 'Relation Name' in node}) == 1
+    scans = []
+    for node in nodes:
+        if node.get('Node Type') != 'Seq Scan' or 'Relation Name' not in node:
+            continue
+        alias = re.escape(node.get('Alias') or node['Relation Name'])
+        condition = node.get('Filter', '')
+        # 스캔 노드의 Output은 테이블 전체 컬럼일 수 있어 빼고, 필터와 위쪽 노드에서 실제로 쓰는 컬럼만 모음
+        used = ' '.join(text for other in nodes for text in _node_texts(other, skip_output=other is node))
+        columns = set(re.findall(rf"\b{alias}\.(\w+)", used))
+        if single_relation:
+            # 테이블이 하나인 쿼리는 위쪽 노드에서 컬럼이 별칭 없이 표시됨 (테이블 컬럼과의 교집합만 사용)
+            columns.update(re.findall(r"\b(\w+)\b", used))
+        scans.append({
+            'schema': node.get('Schema', 'public'),
+            'table': node['Relation Name'],
+            'range': _filter_columns(alias, r"(?:>=|>|<=|<)", condition),
+            'ilike': _filter_columns(alias, r"~~\*", condition),
+            'equal': _filter_columns(alias, r"=", condition),
+            'columns': columns
+        })
+    return scans
+
+class IndexAdvisor:
+    """쿼리 목록의 실행 계획으로 인덱스를 추천하고, 시험 모드에서는 만들어 보고 전후 실행 시간을 비교"""
+    def __init__(self, db, runs=2):
+        self.db = db
+        self.runs = runs  # EXPLAIN ANALYZE 반복 횟수 (가장 빠른 값 사용)
+        self.server_version = None
+        self._tables = {}
+    
+    def session_workload(self):
+        """이 프로세스에서 실행한 쿼리 (쿼리 모양별 마지막 실행 값)"""
+        workload = []
+        for sample in metrics.statement_samples():
+            query = sample['query']
+            if not _EXPLAINABLE_PATTERN.match(query) or _CATALOG_PATTERN.search(query):
+                continue
+            item = {
+                'label': f"실행 기록 ({sample['count']}회, {sample['total_ms']} ms)",
+                'query': query,
+                'params': sample['params']
+            }
+            match = _EXECUTE_PATTERN.match(query)
+            if match:
+                if match.group(1) not in prepared_queries:
+                    continue
+                item['prepared'] = (match.group(1), prepared_queries[match.group(1)])
+            workload.append(item)
+        return workload
+    
+    def stat_statements_workload(self, limit=20):
+        """pg_stat_statements에서 총 실행 시간이 긴 SELECT 쿼리 (확장이 없으면 빈 목록)"""
+        installed = self.db.execute_query("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")
+        if not installed or not installed.get('data'):
+            print("ℹ️ pg_stat_statements 확장이 없어 서버 통계는 건너뜁니다.")
+            return []
+        
+        # PostgreSQL 13부터 total_time이 total_exec_time으로 바뀜
+        column = self.db.execute_query("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_name = 'pg_stat_statements' AND column_name IN ('total_exec_time', 'total_time')
+        """)
+        if not column or not column.get('data'):
+            return []
+        total_column = column['data'][0][0]
+        
+        result = self.db.execute_query(f"""
+        SELECT query, calls, {total_column} / GREATEST(calls, 1) AS mean_ms
+        FROM pg_stat_statements
+        WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+            AND query ~* '^\\s*(select|with)\\M'
+            AND query !~* '(pg_catalog|information_schema|pg_stat)'
+        ORDER BY {total_column} DESC
+        LIMIT %s
+        """, (limit,))
+        if not result or 'data' not in result:
+            return []
+        
+        return [
+            {
+                'label': f"pg_stat_statements ({calls:,}회, 평균 {mean_ms:.1f} ms)",
+                'query': query,
+                'params': None,
+                # 상수가 $1로 바뀌어 있으므로 실행할 수 없고 일반 계획만 볼 수 있음
+                'generic': '$1' in query
+            }
+            for query, calls, mean_ms in result['data']
+        ]
+    
+    def explain_item(self, item, analyze=True):
+        """쿼리 하나의 EXPLAIN (VERBOSE) 결과 (실패 시 None)"""
+        if item.get('prepared') and not self.db.prepare(*item['prepared']):
+            return None
+        generic = item.get('generic', False)
+        if generic and self.server_version < 160000:
+            return None
+        return self.db.explain(item['query'], item.get('params'), analyze=analyze and not generic,
+                               verbose=True, generic_plan=generic)
+    
+    def measure(self, item):
+        """쿼리의 실행 시간(ms, 일반 계획이면 None)과 예상 비용, 실행 계획 (runs번 중 가장 빠른 값, 실패 시 None)"""
+        best = None
+        for _ in range(1 if item.get('generic') else self.runs):
+            plan = self.explain_item(item)
+            if plan is None:
+                return None
+            if best is None or plan[0].get('Execution Time', 0) < best[0].get('Execution Time', 0):
+                best = plan
+        return {
+            'ms': best[0].get('Execution Time'),
+            'cost': best[0]['Plan']['Total Cost'],
+            'plan': best
+        }
+    
+    def table_info(self, schema, table):
+        """테이블의 컬럼, 예상 행 수/페이지 수, 기존 인덱스 정의, 컬럼별 물리 순서 상관관계"""
+        key = (schema, table)
+        if key in self._tables:
+            return self._tables[key]
+        
+        result = self.db.execute_query("""
+        SELECT c.oid, c.reltuples::bigint, c.relpages
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = %s AND c.relname = %s
+        """, (schema, table))
+        if not result or not result.get('data'):
+            return None
+        oid, reltuples, relpages = result['data'][0]
+        
+        columns = self.db.execute_query(
+            "SELECT attname FROM pg_attribute WHERE attrelid = %s AND attnum > 0 AND NOT attisdropped", (oid,)
+        )
+        indexes = self.db.execute_query(
+            "SELECT indexdef FROM pg_indexes WHERE schemaname = %s AND tablename = %s", (schema, table)
+        )
+        stats = self.db.execute_query(
+            "SELECT attname, correlation FROM pg_stats WHERE schemaname = %s AND tablename = %s", (schema, table)
+        )
+        info = self._tables[key] = {
+            'rows': reltuples,  # 한 번도 ANALYZE하지 않은 테이블은 -1
+            'pages': relpages,
+            'columns': {row[0] for row in columns['data']} if columns else set(),
+            'indexes': [row[0] for row in indexes['data']] if indexes else [],
+            'correlation': {name: value for name, value in stats['data']} if stats else {}
+        }
+        return info
+    
+    def _has_index(self, info, method, column, opclass=None, includes=()):
+        """같은 방식으로 column이 첫 번째 키인 인덱스가 이미 있는지 (includes 컬럼까지 모두 들어 있어야 함)"""
+        key = _ident(column) + (f" {opclass}" if opclass else '')
+        pattern = re.compile(rf"USING {method} \({re.escape(key)}[,) ]")
+        return any(
+            pattern.search(indexdef) and all(re.search(rf"\b{re.escape(_ident(name))}\b", indexdef) for name in includes)
+            for indexdef in info['indexes']
+        )
+    
+    def suggest(self, scan):
+        """순차 스캔 하나에 대한 인덱스 추천 목록 [{'name', 'kind', 'schema', 'table', 'column', 'includes', 'reason'}]"""
+        info = self.table_info(scan['schema'], scan['table'])
+        if info is None or 0 <= info['rows'] < MIN_TABLE_ROWS:
+            return []
+        
+        table = scan['table']
+        suggestions = []
+        
+        def add(kind, column, reason, includes=()):
+            suggestions.append({
+                'name': f"{table}_{column}_{kind}"[:63], 'kind': kind, 'schema': scan['schema'], 'table': table,
+                'column': column, 'includes': list(includes), 'reason': reason
+            })
+        
+        for column in scan['range']:
+            includes = sorted((scan['columns'] & info['columns']) - {column})
+            if not self._has_index(info, 'btree', column, includes=includes):
+                add('covering', column,
+                    f"{column} 범위 조건 - 필요한 컬럼을 INCLUDE해서 테이블을 읽지 않는 index-only scan 가능", includes)
+            
+            correlation = info['correlation'].get(column) or 0
+            if (info['pages'] >= BRIN_MIN_PAGES and abs(correlation) >= BRIN_MIN_CORRELATION
+                    and not self._has_index(info, 'brin', column)):
+                add('brin', column,
+                    f"{column} 범위 조건 - 값이 물리 순서대로 쌓여 있어 (상관관계 {correlation:.2f}) 아주 작은 BRIN으로 블록 범위를 건너뜀")
+        
+        for column in scan['ilike']:
+            if not self._has_index(info, 'gin', column, opclass='gin_trgm_ops'):
+                add('trgm', column,
+                    f"{column} ILIKE '%...%' 조건 - 앞부분이 정해지지 않은 부분 일치는 pg_trgm GIN 인덱스만 사용 가능")
+        
+        for column in scan['equal']:
+            if column in scan['range'] or column in scan['ilike']:
+                continue
+            if not self._has_index(info, 'btree', column):
+                add('idx', column, f"{column} 같음 조건")
+        
+        return suggestions
+    
+    def index_state(self, schema, name):
+        """같은 이름의 릴레이션 상태 (없으면 None, 인덱스면 유효 여부 True/False, 인덱스가 아니면 'other', 조회 실패 시 'unknown')"""
+        result = self.db.execute_query("""
+        SELECT c.relkind, i.indisvalid
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        LEFT JOIN pg_index i ON i.indexrelid = c.oid
+        WHERE n.nspname = %s AND c.relname = %s
+        """, (schema, name))
+        if result is None or 'data' not in result:
+            return 'unknown'
+        if not result['data']:
+            return None
+        relkind, valid = result['data'][0]
+        return bool(valid) if relkind == 'i' else 'other'
+    
+    def _free_index_name(self, schema, name, taken):
+        """DB와 이번 추천에서 아직 쓰지 않은 인덱스 이름 (겹치면 _2, _3 ... 을 붙임)"""
+        candidate = name
+        number = 1
+        while (schema, candidate) in taken or self.index_state(schema, candidate) is not None:
+            number += 1
+            suffix = f"_{number}"
+            candidate = name[:63 - len(suffix)] + suffix
+        taken.add((schema, candidate))
+        return candidate
+    
+    def create_index_sql(self, suggestion, concurrently=True, if_not_exists=True):
+        """추천 인덱스 생성 DDL (운영 DB에는 쓰기를 막지 않는 CONCURRENTLY 사용)"""
+        column = _ident(suggestion['column'])
+        if suggestion['kind'] == 'brin':
+            definition = f"USING brin ({column})"
+        elif suggestion['kind'] == 'trgm':
+            definition = f"USING gin ({column} gin_trgm_ops)"
+        else:
+            definition = f"({column})"
+            # INCLUDE 컬럼이 너무 많으면 인덱스가 테이블만큼 커지므로 키 컬럼만 사용
+            if suggestion['includes'] and len(suggestion['includes']) <= MAX_INCLUDE_COLUMNS:
+                definition += f" INCLUDE ({', '.join(_ident(name) for name in suggestion['includes'])})"
+        
+        option = " CONCURRENTLY" if concurrently else ""
+        option += " IF NOT EXISTS" if if_not_exists else ""
+        return (f"CREATE INDEX{option} {_ident(suggestion['name'])} "
+                f"ON {_ident(suggestion['schema'])}.{_ident(suggestion['table'])} {definition};")
+    
+    def advise(self, workload, trial=False, keep=False, filename=None):
+        """workload 쿼리들을 EXPLAIN해서 인덱스를 추천하고 DDL 파일 저장
+        
+        trial=True이면 인덱스를 하나씩 만들어 보고 관련 쿼리의 전후 실행 시간을 비교 (keep=False이면 다시 삭제)
+        추천 목록 반환 (실패 시 None)
+        """
+        version = self.db.execute_query("SHOW server_version_num")
+        if not version or 'data' not in version:
+            return None
+        self.server_version = int(version['data'][0][0])
+        
+        # 같은 모양의 쿼리는 한 번만 분석
+        seen = set()
+        items = []
+        for item in workload:
+            fingerprint = query_fingerprint(item['prepared'][1] if item.get('prepared') else item['query'])
+            if fingerprint not in seen:
+                seen.add(fingerprint)
+                items.append(item)
+        
+        print(f"\n🔍 {len(items)}개 쿼리의 실행 계획을 분석합니다...")
+        suggestions = {}
+        for number, item in enumerate(items, 1):
+            item['before'] = self.measure(item)
+            if item['before'] is None:
+                print(f"  {number}. {item['label']}: ⚠️ 실행 계획을 볼 수 없어 건너뜀")
+                continue
+            
+            scans = find_seq_scans(item['before']['plan'])
+            print(f"  {number}. {item['label']}: {self._format_timing(item['before'])}, "
+                  f"순차 스캔 {', '.join(scan['table'] for scan in scans) or '없음'}")
+            for scan in scans:
+                for suggestion in self.suggest(scan):
+                    merged = suggestions.setdefault(suggestion['name'], dict(suggestion, items=[]))
+                    # 같은 인덱스를 추천받은 쿼리들이 쓰는 컬럼을 모두 INCLUDE
+                    merged['includes'] = sorted(set(merged['includes']) | set(suggestion['includes']))
+                    suggestion = merged
+                    if not any(existing is item for existing in suggestion['items']):
+                        suggestion['items'].append(item)
+        
+        suggestions = list(suggestions.values())
+        if not suggestions:
+            print("✅ 추천할 인덱스가 없습니다.")
+            return []
+        
+        # 이름만 같은 다른 인덱스가 이미 있으면 IF NOT EXISTS가 아무것도 만들지 않으므로 겹치지 않는 이름 사용
+        taken = set()
+        for suggestion in suggestions:
+            suggestion['name'] = self._free_index_name(suggestion['schema'], suggestion['name'], taken)
+        
+        if trial:
+            self.trial(suggestions, keep)
+        
+        print(f"\n📋 추천 인덱스 {len(suggestions)}개:")
+        print("-" * 100)
+        for suggestion in suggestions:
+            print(f"[{suggestion['kind']}] {self.create_index_sql(suggestion)}")
+            print(f"    {suggestion['reason']}")
+            print(f"    대상 쿼리: {', '.join(item['label'] for item in suggestion['items'])}")
+            if suggestion.get('after'):
+                print(f"    시험 결과: {suggestion['after']}")
+        print("-" * 100)
+        
+        filename = self.save_ddl(suggestions, filename)
+        if filename:
+            print(f"✅ 인덱스 DDL이 저장되었습니다: {filename}")
+        return suggestions
+    
+    def _execute_concurrently(self, sql):
+        """CREATE/DROP INDEX CONCURRENTLY 실행 (트랜잭션 블록 안에서는 실행할 수 없으므로 잠깐 autocommit으로 전환)"""
+        connection = self.db.connection
+        if connection is None:
+            return self.db.execute_query(sql)
+        connection.commit()  # 앞선 조회로 열린 트랜잭션 종료
+        connection.autocommit = True
+        try:
+            return self.db.execute_query(sql)
+        finally:
+            connection.autocommit = False
+    
+    def trial(self, suggestions, keep=False):
+        """추천 인덱스를 하나씩 만들어 보고 관련 쿼리의 전후 시간 비교 (읽기 전용 DB면 중단)
+        
+        운영 DB에서도 쓰기를 막지 않도록 CONCURRENTLY로 만들고 삭제함
+        (같은 이름의 인덱스가 이미 있으면 시험하지 않고, 삭제는 이번 시험에서 만든 인덱스만)
+        """
+        print("\n🧪 인덱스를 만들어 보고 전후 실행 시간을 비교합니다...")
+        trigram_ready = None
+        for suggestion in suggestions:
+            if suggestion['kind'] == 'trgm':
+                if trigram_ready is None:
+                    trigram_ready = self.db.execute_query("CREATE EXTENSION IF NOT EXISTS pg_trgm") is not None
+                if not trigram_ready:
+                    suggestion['after'] = "pg_trgm 확장을 설치할 수 없어 시험하지 못함"
+                    continue
+            
+            index_name = f"{_ident(suggestion['schema'])}.{_ident(suggestion['name'])}"
+            if self.index_state(suggestion['schema'], suggestion['name']) is not None:
+                suggestion['after'] = "같은 이름의 인덱스가 이미 있어 시험하지 않음"
+                print(f"  {suggestion['name']}: ⚠️ {suggestion['after']}")
+                continue
+            
+            started = datetime.now()
+            # IF NOT EXISTS 없이 만들어서, 그 사이 같은 이름이 생겼으면 남의 인덱스를 재지 않고 실패하게 함
+            if self._execute_concurrently(self.create_index_sql(suggestion, if_not_exists=False)) is None:
+                # CONCURRENTLY가 중간에 실패하면 이번에 만들던 INVALID 인덱스가 남으므로 그것만 정리
+                if self.index_state(suggestion['schema'], suggestion['name']) is False:
+                    self._execute_concurrently(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+                print("⚠️ 인덱스를 만들 수 없습니다 (읽기 전용 복제본이면 저장된 DDL을 운영 DB에 적용하세요).")
+                return False
+            build_s = (datetime.now() - started).total_seconds()
+            
+            size = self.db.execute_query(
+                "SELECT pg_size_pretty(pg_relation_size(%s::regclass))",
+                (index_name,)
+            )
+            size = size['data'][0][0] if size and size.get('data') else '?'
+            
+            timings = []
+            for item in suggestion['items']:
+                after = self.measure(item)
+                if after is not None:
+                    timings.append(f"{self._format_timing(item['before'])} → {self._format_timing(after)}")
+            suggestion['after'] = f"{'; '.join(timings) or '측정 실패'} (인덱스 {size}, 생성 {build_s:.1f}초)"
+            print(f"  {suggestion['name']}: {suggestion['after']}")
+            
+            if not keep:
+                self._execute_concurrently(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+        return True
+    
+    def _format_timing(self, measured):
+        """실행 시간 (일반 계획만 본 쿼리는 예상 비용)"""
+        if measured['ms'] is None:
+            return f"예상 비용 {measured['cost']:,.0f}"
+        return f"{measured['ms']:,.1f} ms"
+    
+    def save_ddl(self, suggestions, filename=None):
+        """추천 인덱스 DDL을 SQL 파일로 저장 (CONCURRENTLY는 트랜잭션 밖에서 한 문장씩 실행해야 함)"""
+        if not filename:
+            filename = f"index_suggestions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.sql"
+        
+        lines = [
+            f"-- 인덱스 추천 ({datetime.now().isoformat(timespec='seconds')})",
+            "-- CREATE INDEX CONCURRENTLY는 트랜잭션 블록 안에서 실행할 수 없으므로 한 문장씩 실행하세요.",
+            ""
+        ]
+        if any(suggestion['kind'] == 'trgm' for suggestion in suggestions):
+            lines += ["CREATE EXTENSION IF NOT EXISTS pg_trgm;", ""]
+        for suggestion in suggestions:
+            lines.append(f"-- {suggestion['reason']}")
+            lines.append(f"-- 대상 쿼리: {', '.join(item['label'] for item in suggestion['items'])}")
+            if suggestion.get('after'):
+                lines.append(f"-- 시험 결과: {suggestion['after']}")
+            lines.append(self.create_index_sql(suggestion))
+            lines.append("")
+        
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines))
+            return filename
+        except Exception as e:
+            print(f"❌ DDL 파일 저장 실패: {e}")
+            return None
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""월간미션 API 부하 테스트 - Flask 개발 서버와 gunicorn의 처리량 비교
+
+로컬 PostgreSQL을 DB_* 환경변수로 지정해서 실행:
+    DB_HOST=localhost DB_NAME=mission DB_USER=postgres DB_PASSWORD= \\
+        python3 load_test.py --requests 200 --concurrency 16
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SERVER_COMMANDS = {
+    'dev': [sys.executable, 'monthly_mission_calculator.py'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                 'monthly_mission_calculator:create_app()'],
+}
+
+def start_server(name, port, with_cache):
+    """서버 프로세스 시작"""
+    env = dict(os.environ, PORT=str(port))
+    if not with_cache:
+        # 캐시를 끄고 매 요청이 DB 집계를 거치도록 함
+        env['MISSION_CACHE_MAX_MB'] = '0'
+        env.pop('MISSION_CACHE_DIR', None)
+    return subprocess.Popen(SERVER_COMMANDS[name], cwd=BASE_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def wait_until_ready(base_url, timeout=30):
+    """서버가 응답할 때까지 대기"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + '/', timeout=2):
+                return True
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.3)
+    return False
+
+def send_request(base_url, year, month):
+    """/api/calculate 요청 한 번 (성공 여부, 응답 시간) 반환"""
+    body = json.dumps({'year': year, 'month': month, 'adjustment_factor': 1.0}).encode('utf-8')
+    req = urllib.request.Request(base_url + '/api/calculate', data=body,
+                                 headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=300) as response:
+            response.read()
+            ok = response.status == 200
+    except (urllib.error.URLError, ConnectionError):
+        ok = False
+    return ok, time.perf_counter() - start
+
+def run_load(base_url, months, total_requests, concurrency):
+    """동시 요청을 보내고 처리량과 응답 시간 통계 계산"""
+    targets = [months[i % len(months)] for i in range(total_requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda target: send_request(base_url, *target), targets))
+    elapsed = time.perf_counter() - start
+    
+    latencies = sorted(latency for ok, latency in results if ok)
+    failures = sum(1 for ok, _ in results if not ok)
+    if not latencies:
+        return {'requests': total_requests, 'failures': failures, 'elapsed_s': round(elapsed, 3)}
+    
+    return {
+        'requests': total_requests,
+        'failures': failures,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'latency_avg_ms': round(statistics.mean(latencies) * 1000, 1),
+        'latency_p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+        'latency_p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+    }
+
+def parse_months(year, months_arg):
+    """'1-12' 또는 '3,4,5' 형식의 월 목록을 (연도, 월) 목록으로 변환"""
+    if '-' in months_arg:
+        first, last = (int(part) for part in months_arg.split('-'))
+        months = range(first, last + 1)
+    else:
+        months = [int(part) for part in months_arg.split(',')]
+    return [(year, month) for month in months]
+
+def main():
+    parser = argparse.ArgumentParser(description='월간미션 API 부하 테스트 (개발 서버 vs gunicorn)')
+    parser.add_argument('--servers', default='dev,gunicorn', help='비교할 서버 (dev, gunicorn)')
+    parser.add_argument('--requests', type=int, default=200, help='서버별 총 요청 수')
+    parser.add_argument('--concurrency', type=int, default=16, help='동시 요청 수')
+    parser.add_argument('--year', type=int, default=time.localtime().tm_year)
+    parser.add_argument('--months', default='1-12', help="요청할 월 (예: '1-12', '3,4,5')")
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--with-cache', action='store_true', help='결과 캐시를 켠 상태로 측정')
+    parser.add_argument('--json', dest='json_path', help='결과를 JSON 파일로 저장')
+    args = parser.parse_args()
+    
+    months = parse_months(args.year, args.months)
+    summary = {}
+    
+    for name in args.servers.split(','):
+        base_url = f"http://127.0.0.1:{args.port}"
+        print(f"🚀 {name} 서버 시작...")
+        process = start_server(name, args.port, args.with_cache)
+        try:
+            if not wait_until_ready(base_url):
+                print(f"❌ {name} 서버가 시작되지 않았습니다.")
+                continue
+            
+            # 워밍업 (연결 풀, 임포트 등)
+            run_load(base_url, months, min(len(months), args.concurrency), args.concurrency)
+            
+            print(f"📊 {name}: {args.requests}개 요청, 동시 {args.concurrency}개...")
+            summary[name] = run_load(base_url, months, args.requests, args.concurrency)
+            print(f"   {summary[name]}")
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+    
+    if 'dev' in summary and 'gunicorn' in summary and summary['dev'].get('throughput_rps'):
+        gain = summary['gunicorn'].get('throughput_rps', 0) / summary['dev']['throughput_rps']
+        summary['gunicorn_vs_dev'] = round(gain, 2)
+        print(f"\n✅ gunicorn 처리량이 개발 서버의 {gain:.2f}배입니다.")
+    
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.json_path}")
+
+if __name__ == '__main__':
+    main()
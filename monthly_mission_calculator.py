@@ -1,20 +1,324 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from db_connector import PostgreSQLConnector
-from datetime import datetime, timedelta
-import calendar
+from business_calendar import business_calendar
+from daily_rollup import DailyRollup, MISSING_ID
+from db_connector import PostgreSQLConnector, PoolError
+from precompute import PrecomputeScheduler
+from query_metrics import metrics
+from query_result import QueryResult
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal, ROUND_HALF_UP
+import argparse
+import asyncio
+import base64
+import copy
+import gzip
+import hashlib
+import hmac
 import json
 import os
-from flask import Flask, request, jsonify, render_template
+import pickle
+import sys
+import threading
+import time
+import numpy as np
+from flask import Blueprint, Flask, Response, request, jsonify, render_template
 from flask_cors import CORS
+from werkzeug.http import is_resource_modified
 
-app = Flask(__name__)
-CORS(app)
+try:
+    import orjson  # 있으면 큰 응답을 표준 json보다 빠르게 직렬화
+except ImportError:
+    orjson = None
+
+try:
+    import brotli  # 있으면 Accept-Encoding: br 요청에 brotli 압축 사용
+except ImportError:
+    brotli = None
+
+api = Blueprint('api', __name__)
+
+def _digest(payload):
+    """바이트 내용 해시 (캐시 항목의 데이터 버전, ETag에 사용)"""
+    return hashlib.sha256(payload).hexdigest()[:32]
+
+class MonthlyDataCache:
+    """월별 집계 결과 캐시
+    
+    - 마감된 달: 만료 없이 보관 (cache_dir을 주면 디스크에도 저장해서 재시작 후에도 유지)
+    - 진행 중인 달: ttl초 동안만 보관
+    - 전체 크기가 max_bytes를 넘으면 가장 오래 안 쓴 항목부터 제거 (LRU)
+    - 항목마다 데이터 버전(내용 해시, 저장 시각)을 함께 보관 (HTTP ETag/Last-Modified에 사용)
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=300, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()  # key -> (value, 크기, 만료 시각 또는 None, (내용 해시, 저장 시각))
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+    
+    # 디스크 파일 형식 버전 (저장하는 값의 형태가 바뀌면 올려서 이전 형식 파일을 읽지 않게 함)
+    # v2: 집계 결과를 dict 대신 열 단위 QueryResult로 저장
+    # v3: 사용자별 일별 데이터에 지점_id 열 추가
+    DISK_FORMAT = 'v3'
+    
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, '_'.join(str(part) for part in key) + f'.{self.DISK_FORMAT}.pickle')
+    
+    def _store(self, key, value, size, expires_at, version):
+        """메모리에 저장하고 용량 초과분 제거 (락을 잡은 상태에서 호출)"""
+        self._remove(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size, expires_at, version)
+        self._total_bytes += size
+        while self._total_bytes > self.max_bytes:
+            _, (_, evicted_size, _, _) = self._entries.popitem(last=False)
+            self._total_bytes -= evicted_size
+    
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._total_bytes -= entry[1]
+    
+    def get(self, key):
+        """캐시 조회 (없거나 만료되면 None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                value, _, expires_at, _ = entry
+                if expires_at is None or time.time() < expires_at:
+                    self._entries.move_to_end(key)
+                    return value
+                self._remove(key)
+        
+        # 메모리에 없으면 디스크에 저장된 마감 월 데이터 확인
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'rb') as f:
+                    payload = f.read()
+                    stored_at = os.fstat(f.fileno()).st_mtime
+                value = pickle.loads(payload)
+            except FileNotFoundError:
+                return None
+            except Exception as e:
+                print(f"⚠️ 캐시 파일을 읽을 수 없습니다 ({path}): {e}")
+                return None
+            with self._lock:
+                self._store(key, value, len(payload), None, (_digest(payload), stored_at))
+            return value
+        
+        return None
+    
+    def set(self, key, value, permanent=False):
+        """캐시 저장 (permanent=True면 만료 없음 + 디스크 저장)"""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        expires_at = None if permanent else now + self.ttl
+        with self._lock:
+            self._store(key, value, len(payload), expires_at, (_digest(payload), now))
+        
+        if permanent and self.cache_dir:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"⚠️ 캐시 파일 저장 실패 ({path}): {e}")
+    
+    def version(self, key):
+        """캐시된 값의 데이터 버전 (내용 해시, 저장 시각) - 없거나 만료되면 None (디스크의 마감 월 데이터도 확인)"""
+        if self.get(key) is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[3] if entry else None
+    
+    def invalidate(self, key=None):
+        """캐시 삭제 (key가 없으면 전체 삭제, 디스크 포함)"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._total_bytes = 0
+            else:
+                self._remove(key)
+        
+        if self.cache_dir:
+            if key is None:
+                paths = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                         if name.endswith('.pickle')]
+            else:
+                paths = [self._disk_path(key)]
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+    
+    def stats(self):
+        """캐시 상태 (항목 수, 사용 중인 크기)"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes
+            }
+
+class DimensionCache:
+    """지점/사용자 id -> 이름 캐시
+    
+    무거운 집계 쿼리는 id만 반환하고 이름은 여기서 붙임
+    (처음 보는 id만 DB에서 조회하고, 테이블별로 ttl초가 지나면 비우고 다시 조회해서 이름 변경을 반영)
+    """
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self._tables = {}  # 테이블 -> (id -> 이름, 만료 시각)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def lookup(self, db, table, ids):
+        """{id: 이름} 반환 (테이블에 없는 id는 None, DB 조회 실패 시 None)"""
+        ids = {i for i in ids if i is not None}
+        now = time.time()
+        with self._lock:
+            names, expires_at = self._tables.get(table, (None, 0))
+            if names is None or now >= expires_at:
+                names = {}
+                self._tables[table] = (names, now + self.ttl)
+            found = {i: names[i] for i in ids if i in names}
+            missing = sorted(ids - found.keys())
+            self.hits += len(found)
+            self.misses += len(missing)
+        
+        if missing:
+            result = db.execute_query(f"SELECT id, name FROM {table} WHERE id = ANY(%s)", (missing,))
+            if result is None:
+                return None
+            fetched = dict.fromkeys(missing)  # 테이블에 없는 id도 None으로 기억
+            fetched.update(result['data'])
+            with self._lock:
+                names.update(fetched)
+            found.update(fetched)
+        
+        return found
+    
+    def stats(self):
+        """캐시 상태 (테이블별 id 수, 적중/누락 횟수)"""
+        with self._lock:
+            return {
+                'tables': {table: len(names) for table, (names, _) in self._tables.items()},
+                'hits': self.hits,
+                'misses': self.misses,
+                'ttl': self.ttl
+            }
+
+class SingleFlight:
+    """같은 키의 동시 계산을 하나로 합침 (single-flight)
+    
+    먼저 온 요청(leader)만 계산하고, 계산이 끝나기 전에 같은 키로 들어온 요청은 그 결과(또는 예외)를 함께 받음
+    gunicorn 스레드와 요청별 이벤트 루프 사이에서도 공유되도록 concurrent.futures.Future로 결과를 전달
+    leader가 어떻게 끝나든(취소 포함) 키를 지우고 Future를 완료하며, 기다리는 요청은 최대 wait_timeout초만 기다림
+    """
+    def __init__(self, wait_timeout=300):
+        self.wait_timeout = wait_timeout
+        self._calls = {}  # key -> 진행 중인 계산의 Future
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+    
+    def _join(self, key):
+        """(Future, leader 여부) 반환 - 진행 중인 계산이 없으면 새로 등록"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = self._calls[key] = Future()
+            # 실행 중 상태로 두어 기다리던 쪽이 취소해도 공유 Future가 취소되지 않게 함
+            future.set_running_or_notify_cancel()
+            self.leaders += 1
+            return future, True
+    
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            del self._calls[key]
+        if error is None:
+            future.set_result(result)
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+        else:
+            # leader가 취소/종료된 경우 (CancelledError 등) - 기다리던 요청은 일반 오류로 받음
+            failure = RuntimeError('같은 달을 먼저 조회하던 요청이 중단되었습니다.')
+            failure.__cause__ = error
+            future.set_exception(failure)
+    
+    def do(self, key, func):
+        """key로 진행 중인 계산이 있으면 결과를 기다리고, 없으면 func()를 실행"""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result(timeout=self.wait_timeout)
+        try:
+            result = func()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+    
+    async def do_async(self, key, func):
+        """do의 비동기 버전 (func는 코루틴 함수, 기다리는 동안 이벤트 루프를 막지 않음)"""
+        future, leader = self._join(key)
+        if not leader:
+            # 기다리던 요청이 취소되거나 시간이 지나도 공유 Future는 그대로 둠 (shield)
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.wait_timeout)
+        try:
+            result = await func()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+    
+    def stats(self):
+        """진행 중인 계산 수, 직접 계산한 횟수, 다른 요청의 결과를 함께 받은 횟수"""
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'shared': self.shared
+            }
 
 class MonthlyMissionCalculator:
-    def __init__(self):
-        self.db = PostgreSQLConnector()
+    # 늦게 동기화되는 기록을 고려해 다음 달 1일 이후 이 시간이 지나야 마감된 달로 취급
+    CLOSED_MONTH_GRACE = timedelta(days=1)
+    
+    # 스냅샷 파일 이름 (데이터 월별 디렉터리 month=YYYY-MM 안에 저장)
+    SNAPSHOT_TABLES = ('previous_month', 'branch_weekday')
+    
+    # 사용자별 일별 데이터 / 지점별 요일별 데이터 열 (지점_id는 지점별 목표 계산용, 기존 열 위치가 바뀌지 않도록 마지막에 둠)
+    PREVIOUS_MONTH_COLUMNS = ['운동일', '요일', '사용자_id', '사용자_이름', '운동장소', '총_운동_거리_km', '지점_id']
+    BRANCH_WEEKDAY_COLUMNS = ['지점명', '요일', '사용자수', '총_운동_거리_km', '평균_운동_거리_km']
+    
+    def __init__(self, db=None, cache=None, calendar=None, rollup=None, snapshot_dir=None, names=None):
+        self.db = db or PostgreSQLConnector()
+        self.cache = cache
+        self.names = names or DimensionCache()  # 지점/사용자 이름 (요청 세션끼리 공유)
+        self.inflight = SingleFlight()  # 같은 달 동시 조회를 하나로 합침 (요청 세션끼리 공유)
+        self.business_calendar = calendar or business_calendar
+        self.rollup = rollup  # 지정하면 원본 기록 대신 일별 롤업(daily_rollup.py)에서 집계
+        self.snapshot_dir = snapshot_dir  # 지정하면 DB 없이 로컬 스냅샷(save_snapshot)으로만 계산
     
     def connect(self):
         """데이터베이스 연결"""
@@ -24,9 +328,16 @@ class MonthlyMissionCalculator:
         """데이터베이스 연결 해제"""
         self.db.disconnect()
     
-    def get_previous_month_data(self, year, month):
-        """이전 달의 유산소 기록 데이터 조회"""
-        # 이전 달 계산
+    @contextmanager
+    def session(self):
+        """풀에서 빌린 연결을 쓰는 요청 전용 계산기 (연결은 첫 쿼리 때 빌리고 블록이 끝나면 반납)"""
+        with self.db.borrow(lazy=True) as db:
+            session = copy.copy(self)
+            session.db = db
+            yield session
+    
+    def get_previous_month_range(self, year, month):
+        """이전 달의 조회 기간 (시작일, 다음 달 1일)"""
         if month == 1:
             prev_year = year - 1
             prev_month = 12
@@ -40,15 +351,29 @@ class MonthlyMissionCalculator:
         else:
             end_date = f"{prev_year}-{prev_month + 1:02d}-01"
         
+        return start_date, end_date
+    
+    def get_previous_month_data(self, year, month):
+        """이전 달의 유산소 기록 데이터 조회"""
+        if self.has_local_source():
+            return self.get_local_month_data(year, month)[0]
+        result = self.db.execute_prepared(
+            'previous_month_data', self.previous_month_query(), self.get_previous_month_range(year, month)
+        )
+        return self.attach_names(result)
+    
+    def previous_month_query(self):
+        """이전 달 사용자별 일별 데이터 조회 쿼리 ($1: 시작일, $2: 다음 달 1일)
+        
+        기록을 (일, 사용자, 지점)별로 먼저 집계하고 id만 반환 - 이름은 attach_names에서 붙임
+        """
         # 사용자별 일별 총 거리만 계산 (지점 중복 제거)
-        query = f"""
+        query = """
         SELECT
             TO_CHAR(DATE_TRUNC('day', a.start_datetime), 'YYYY-MM-DD') AS 운동일,
             TO_CHAR(DATE_TRUNC('day', a.start_datetime), 'Dy') AS 요일,
             a.user_id AS 사용자_id,
-            u.name AS 사용자_이름,
-            -- 지점이 여러개면 첫 번째 지점만 사용
-            (SELECT b2.name FROM b_class_bplace b2 WHERE b2.id = a.b_place_id LIMIT 1) AS 운동장소,
+            a.b_place_id AS 지점_id,
             ROUND(SUM(CASE 
                 WHEN a.device_type = 'treadmill' THEN a.distance
                 WHEN a.device_type = 'cycle' THEN a.distance * 0.4
@@ -56,38 +381,53 @@ class MonthlyMissionCalculator:
                 ELSE 0 END) / 1000.00, 2) AS 총_운동_거리_km
         FROM
             b_class_userplaylog a
-        LEFT JOIN
-            user_user u ON u.id = a.user_id
         WHERE
-            a.start_datetime >= '{start_date}'
-            AND a.start_datetime < '{end_date}'
+            a.start_datetime >= $1
+            AND a.start_datetime < $2
         GROUP BY
-            DATE_TRUNC('day', a.start_datetime), a.user_id, u.name, a.b_place_id
+            DATE_TRUNC('day', a.start_datetime), a.user_id, a.b_place_id
         ORDER BY
             운동일, 사용자_id;
         """
         
-        result = self.db.execute_query(query)
-        return result
+        return query
     
-    def get_branch_weekday_data(self, year, month):
-        """지점별 요일별 데이터 조회"""
-        # 이전 달 계산
-        if month == 1:
-            prev_year = year - 1
-            prev_month = 12
-        else:
-            prev_year = year
-            prev_month = month - 1
+    def attach_names(self, result):
+        """previous_month_query 결과(id만 있음)에 사용자 이름/지점명을 붙여서 사용자별 일별 데이터 형태로 변환
         
-        start_date = f"{prev_year}-{prev_month:02d}-01"
-        if prev_month == 12:
-            end_date = f"{prev_year + 1}-01-01"
-        else:
-            end_date = f"{prev_year}-{prev_month + 1:02d}-01"
+        이름은 고유한 사용자/지점마다 한 번씩만 찾고 (캐시에 없는 것만 DB 조회, 실패 시 None),
+        id 열의 코드를 그대로 써서 이름 열을 사전 인코딩 열로 붙임
+        """
+        if not result or 'data' not in result:
+            return None
+        
+        user_ids, user_codes = result.factorize('사용자_id')
+        place_ids, place_codes = result.factorize('지점_id')
+        user_names = self._lookup_names('user_user', user_ids)
+        place_names = self._lookup_names('b_class_bplace', place_ids)
+        if user_names is None or place_names is None:
+            return None
         
+        prev_month_data = result.select(['운동일', '요일', '사용자_id', '총_운동_거리_km', '지점_id'])
+        prev_month_data = prev_month_data.with_dictionary_column(
+            '사용자_이름', [user_names.get(user_id) for user_id in user_ids], user_codes, 3
+        )
+        return prev_month_data.with_dictionary_column(
+            '운동장소', [place_names.get(place_id) for place_id in place_ids], place_codes, 4
+        )
+    
+    def get_branch_weekday_data(self, year, month):
+        """지점별 요일별 데이터 조회"""
+        if self.has_local_source():
+            return self.get_local_month_data(year, month)[1]
+        return self.db.execute_prepared(
+            'branch_weekday_data', self.branch_weekday_query(), self.get_previous_month_range(year, month)
+        )
+    
+    def branch_weekday_query(self):
+        """이전 달 지점별 요일별 데이터 조회 쿼리 ($1: 시작일, $2: 다음 달 1일)"""
         # 지점별 요일별 데이터 조회 (간단한 방식으로 수정)
-        query = f"""
+        query = """
         SELECT
             COALESCE(b.name, '미지정') AS 지점명,
             TO_CHAR(DATE_TRUNC('day', a.start_datetime), 'Dy') AS 요일,
@@ -107,8 +447,8 @@ class MonthlyMissionCalculator:
         LEFT JOIN
             b_class_bplace b ON b.id = a.b_place_id
         WHERE
-            a.start_datetime >= '{start_date}'
-            AND a.start_datetime < '{end_date}'
+            a.start_datetime >= $1
+            AND a.start_datetime < $2
         GROUP BY
             b.name, TO_CHAR(DATE_TRUNC('day', a.start_datetime), 'Dy')
         ORDER BY
@@ -124,129 +464,561 @@ class MonthlyMissionCalculator:
             END;
         """
         
-        result = self.db.execute_query(query)
-        return result
+        return query
     
-    def calculate_weekday_averages(self, data):
-        """요일별 평균 거리 계산"""
-        if not data or 'data' not in data:
-            return {}
+    def get_combined_month_data(self, year, month):
+        """이전 달 데이터를 한 번만 스캔해서 사용자별 일별 데이터와 지점별 요일별 데이터를 함께 조회
+        
+        get_previous_month_data, get_branch_weekday_data와 같은 형태의 결과 두 개를 반환
+        """
+        start_date, end_date = self.get_previous_month_range(year, month)
+        monthly_data = self.get_combined_range_data(start_date, end_date)
+        if monthly_data is None:
+            return None, None
+        
+        prev_year, prev_month = self.shift_month(year, month, -1)
+        return monthly_data.get((prev_year, prev_month)) or self._empty_month_aggregates()
+    
+    def get_combined_range_data(self, start_date, end_date):
+        """기간 전체를 한 번만 스캔해서 월별 (사용자별 일별 데이터, 지점별 요일별 데이터) 조회
+        
+        {(연도, 월): (사용자별 일별 결과, 지점별 요일별 결과)} 반환 (기록이 없는 달은 빠짐, 실패 시 None)
+        """
+        result = self.db.execute_prepared('combined_range_data', self.combined_range_query(), (start_date, end_date))
+        if not result or 'data' not in result:
+            return None
+        
+        # 집계구분/월별로 행 위치만 골라서 나눔 (열 배열을 행 튜플로 풀지 않음)
+        user_rows = result.array('집계구분') == 0
+        months, month_codes = result.factorize('운동월')
+        user_data = result.take(user_rows)
+        branch_data = result.take(~user_rows).rename({'운동장소': '지점명'}).map_labels(
+            '지점명', lambda place_name: place_name or '미지정'
+        )
+        
+        # 사용자 이름은 쿼리에서 조인하지 않고 고유한 사용자마다 한 번씩 이름 캐시에서 찾음
+        user_ids, user_codes = user_data.factorize('사용자_id')
+        user_names = self._lookup_names('user_user', user_ids)
+        if user_names is None:
+            return None
+        user_data = user_data.with_dictionary_column(
+            '사용자_이름', [user_names.get(user_id) for user_id in user_ids], user_codes, 5
+        ).select(self.PREVIOUS_MONTH_COLUMNS)
+        branch_data = branch_data.select(self.BRANCH_WEEKDAY_COLUMNS)
         
-        weekday_totals = {}
-        weekday_days = {}  # 요일별 실제 일수
+        monthly_data = {}
+        for code, month_str in enumerate(months):
+            in_month = month_codes == code
+            monthly_data[(int(month_str[:4]), int(month_str[5:7]))] = (
+                user_data.take(np.flatnonzero(in_month[user_rows])),
+                branch_data.take(np.flatnonzero(in_month[~user_rows]))
+            )
         
-        for row in data['data']:
-            weekday = row[1]  # 요일
-            distance = float(row[5]) if row[5] else 0  # 총_운동_거리_km
-            date = row[0]  # 운동일
+        return monthly_data
+    
+    def combined_range_query(self):
+        """기간 전체의 월별 사용자별 일별 + 지점별 요일별 데이터 조회 쿼리 ($1: 시작일, $2: 끝 날짜(미포함))"""
+        # 사용자×지점×일 단위로 한 번 집계한 뒤 GROUPING SETS로 두 가지 집계를 월별로 함께 계산
+        # 집계구분 0: 사용자별 일별 행, 1: 지점별 요일별 행
+        # 평균 거리는 원본 기록 단위 평균이므로 기록 수(play_count)를 함께 넘김
+        query = """
+        WITH weighted AS (
+            SELECT
+                DATE_TRUNC('day', a.start_datetime) AS day,
+                a.user_id,
+                a.b_place_id,
+                CASE 
+                    WHEN a.device_type = 'treadmill' THEN a.distance
+                    WHEN a.device_type = 'cycle' THEN a.distance * 0.4
+                    WHEN a.device_type = 'rowing' THEN a.distance * 0.7
+                    ELSE 0 END AS distance
+            FROM
+                b_class_userplaylog a
+            WHERE
+                a.start_datetime >= $1
+                AND a.start_datetime < $2
+        ),
+        daily AS (
+            SELECT
+                DATE_TRUNC('month', day) AS month,
+                day,
+                TO_CHAR(day, 'Dy') AS weekday,
+                user_id,
+                b_place_id,
+                SUM(distance) AS distance,
+                COUNT(distance) AS play_count
+            FROM
+                weighted
+            GROUP BY
+                day, user_id, b_place_id
+        )
+        SELECT
+            GROUPING(d.user_id) AS 집계구분,
+            TO_CHAR(d.month, 'YYYY-MM') AS 운동월,
+            TO_CHAR(d.day, 'YYYY-MM-DD') AS 운동일,
+            d.weekday AS 요일,
+            d.user_id AS 사용자_id,
+            b.name AS 운동장소,
+            d.b_place_id AS 지점_id,
+            COUNT(DISTINCT d.user_id) AS 사용자수,
+            ROUND(SUM(d.distance) / 1000.00, 2) AS 총_운동_거리_km,
+            ROUND(SUM(d.distance) / NULLIF(SUM(d.play_count), 0) / 1000.00, 2) AS 평균_운동_거리_km
+        FROM
+            daily d
+        LEFT JOIN
+            b_class_bplace b ON b.id = d.b_place_id
+        GROUP BY GROUPING SETS (
+            (d.month, d.day, d.weekday, d.user_id, d.b_place_id, b.name),
+            (d.month, b.name, d.weekday)
+        )
+        ORDER BY
+            집계구분, d.month, d.day, d.user_id, b.name, d.b_place_id,
+            CASE d.weekday
+                WHEN 'Mon' THEN 1
+                WHEN 'Tue' THEN 2
+                WHEN 'Wed' THEN 3
+                WHEN 'Thu' THEN 4
+                WHEN 'Fri' THEN 5
+                WHEN 'Sat' THEN 6
+                WHEN 'Sun' THEN 7
+            END;
+        """
+        
+        return query
+    
+    def has_local_source(self):
+        """원본 기록 대신 스냅샷이나 일별 롤업에서 집계하는지 여부"""
+        return self.snapshot_dir is not None or self.rollup is not None
+    
+    def get_local_month_data(self, year, month):
+        """스냅샷 또는 일별 롤업에서 이전 달 집계 읽기 (둘 다 있으면 스냅샷 우선)"""
+        if self.snapshot_dir is not None:
+            return self.get_snapshot_month_data(year, month)
+        return self.get_rollup_month_data(year, month)
+    
+    def _snapshot_path(self, year, month, name):
+        """(year, month) 데이터의 스냅샷 파일 경로"""
+        return os.path.join(self.snapshot_dir, f"month={year:04d}-{month:02d}", f"{name}.parquet")
+    
+    def get_snapshot_month_data(self, year, month):
+        """로컬 스냅샷에서 이전 달 집계 읽기 (메모리 맵으로 읽고 DB는 사용하지 않음, 스냅샷이 없으면 (None, None))"""
+        prev_year, prev_month = self.shift_month(year, month, -1)
+        paths = [self._snapshot_path(prev_year, prev_month, name) for name in self.SNAPSHOT_TABLES]
+        if not all(os.path.exists(path) for path in paths):
+            print(f"⚠️ {prev_year}년 {prev_month}월 스냅샷이 없습니다: {self.snapshot_dir}")
+            return None, None
+        
+        prev_month_data, branch_weekday_data = (self.db.load_parquet(path) for path in paths)
+        if prev_month_data is None or branch_weekday_data is None:
+            return None, None
+        return prev_month_data, branch_weekday_data
+    
+    def save_snapshot(self, start_year, start_month, end_year, end_month):
+        """기간 내 각 월 데이터의 집계를 DB에서 한 번에 조회해 snapshot_dir에 Parquet으로 저장
+        
+        (연도, 월)은 데이터 월 기준 (2025년 3월 목표를 계산하려면 2025년 2월 스냅샷 필요)
+        저장한 월 수 반환 (실패 시 None)
+        """
+        end_date_year, end_date_month = self.shift_month(end_year, end_month, 1)
+        monthly_data = self.get_combined_range_data(
+            f"{start_year}-{start_month:02d}-01", f"{end_date_year}-{end_date_month:02d}-01"
+        )
+        if monthly_data is None:
+            return None
+        
+        saved = 0
+        year, month = start_year, start_month
+        while (year, month) <= (end_year, end_month):
+            aggregates = monthly_data.get((year, month)) or self._empty_month_aggregates()
+            for name, result in zip(self.SNAPSHOT_TABLES, aggregates):
+                path = self._snapshot_path(year, month, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # 다 쓴 파일만 보이도록 임시 파일에 쓴 뒤 교체
+                if not self.db.save_to_parquet(result, path + '.tmp'):
+                    return None
+                os.replace(path + '.tmp', path)
+            saved += 1
+            year, month = self.shift_month(year, month, 1)
+        
+        return saved
+    
+    def get_rollup_month_data(self, year, month):
+        """일별 롤업에서 이전 달 집계 계산 (get_previous_month_data, get_branch_weekday_data와 같은 형태)
+        
+        원본 기록 대신 롤업의 한 달치 행만 읽고, DB에는 사용자/지점 이름만 조회 (실패 시 (None, None))
+        """
+        start_date, end_date = self.get_previous_month_range(year, month)
+        rows = self.rollup.read_range(start_date, end_date)
+        
+        user_names = self._lookup_names('user_user', {row[1] for row in rows})
+        place_names = self._lookup_names('b_class_bplace', {row[2] for row in rows})
+        if user_names is None or place_names is None:
+            return None, None
+        
+        prev_month_rows = []
+        branch_weekday_rows = []
+        weekday_names = self.business_calendar.WEEKDAYS
+        weekdays = {}
+        branches = {}  # (지점명, 요일) -> [사용자 집합, 거리 합계, 기록 수]
+        for day, user_id, place_id, distance, play_count in rows:
+            weekday = weekdays.get(day)
+            if weekday is None:
+                weekday = weekdays[day] = weekday_names[date.fromisoformat(day).weekday()]
+            user_id = None if user_id == MISSING_ID else user_id
+            place_id = None if place_id == MISSING_ID else place_id
+            place_name = place_names.get(place_id)
             
-            if weekday not in weekday_totals:
-                weekday_totals[weekday] = 0
-                weekday_days[weekday] = set()
+            prev_month_rows.append(
+                (day, weekday, user_id, user_names.get(user_id), place_name, self._to_km(distance), place_id)
+            )
             
-            weekday_totals[weekday] += distance
-            weekday_days[weekday].add(date)  # 해당 요일의 날짜들 수집
+            branch = branches.setdefault((place_name, weekday), [set(), None, 0])
+            if user_id is not None:
+                branch[0].add(user_id)
+            if distance is not None:
+                branch[1] = distance if branch[1] is None else branch[1] + distance
+            branch[2] += play_count
         
-        weekday_averages = {}
-        for weekday in weekday_totals:
-            if len(weekday_days[weekday]) > 0:
-                # 요일별 총 거리를 해당 요일의 실제 일수로 나누어 일평균 계산
-                weekday_averages[weekday] = weekday_totals[weekday] / len(weekday_days[weekday])
+        # 원본 쿼리와 같은 순서 (운동일, 사용자_id / 지점명, 요일)
+        prev_month_rows.sort(key=lambda row: (row[0], row[2] is None, row[2] or 0))
+        weekday_order = {name: index for index, name in enumerate(weekday_names)}
+        for (place_name, weekday), (users, distance, play_count) in sorted(
+            branches.items(), key=lambda item: (item[0][0] is None, item[0][0] or '', weekday_order[item[0][1]])
+        ):
+            average = distance / play_count if distance is not None and play_count else None
+            branch_weekday_rows.append(
+                (place_name or '미지정', weekday, len(users), self._to_km(distance), self._to_km(average))
+            )
         
-        return weekday_averages
+        return (QueryResult.from_rows(self.PREVIOUS_MONTH_COLUMNS, prev_month_rows),
+                QueryResult.from_rows(self.BRANCH_WEEKDAY_COLUMNS, branch_weekday_rows))
     
-    def get_business_days(self, year, month):
-        """특정 월의 영업일수 계산 (일요일 격주 운영, 공휴일 제외)"""
-        # 한국 공휴일 (2025년 기준 - 정확한 날짜)
-        holidays_2025 = [
-            '2025-01-01',  # 신정
-            '2025-01-28',  # 설날
-            '2025-01-29',  # 설날
-            '2025-01-30',  # 설날
-            '2025-03-01',  # 삼일절
-            '2025-05-05',  # 어린이날
-            '2025-05-12',  # 부처님오신날
-            '2025-06-06',  # 현충일
-            '2025-08-15',  # 광복절
-            '2025-10-05',  # 추석
-            '2025-10-06',  # 추석
-            '2025-10-07',  # 추석
-            '2025-10-03',  # 개천절
-            '2025-10-09',  # 한글날
-            '2025-12-25',  # 크리스마스
-        ]
+    def _lookup_names(self, table, ids):
+        """id -> 이름 조회 (집계 쿼리와 롤업에는 id만 있으므로 이름 캐시에서 가져옴, 실패 시 None)"""
+        return self.names.lookup(self.db, table, (i for i in ids if i != MISSING_ID))
+    
+    def _to_km(self, distance):
+        """m 단위 거리를 km로 변환 (원본 쿼리의 ROUND(... / 1000.00, 2)와 같은 결과)"""
+        if distance is None:
+            return None
+        return (distance / Decimal('1000.00')).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    
+    def _empty_month_aggregates(self):
+        """기록이 없는 달의 집계 결과 (get_previous_month_data, get_branch_weekday_data와 같은 형태)"""
+        return (
+            QueryResult.from_rows(self.PREVIOUS_MONTH_COLUMNS, []),
+            QueryResult.from_rows(self.BRANCH_WEEKDAY_COLUMNS, [])
+        )
+    
+    def shift_month(self, year, month, months):
+        """(연도, 월)을 months개월만큼 이동"""
+        index = year * 12 + (month - 1) + months
+        return index // 12, index % 12 + 1
+    
+    def is_closed_month(self, year, month):
+        """목표 월의 기준 데이터(이전 달)가 마감되어 더 이상 바뀌지 않는지 여부"""
+        return datetime.now() >= datetime(year, month, 1) + self.CLOSED_MONTH_GRACE
+    
+    def get_month_aggregates(self, year, month):
+        """이전 달 집계 (사용자별 일별 데이터, 지점별 요일별 데이터) 조회 - 캐시 우선
         
-        # 해당 월의 모든 날짜
-        days_in_month = calendar.monthrange(year, month)[1]
-        business_days = 0
+        캐시에 없는 달을 여러 요청이 동시에 조회하면 한 요청만 DB를 조회하고 나머지는 그 결과를 함께 씀
+        """
+        key = (year, month)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
         
-        for day in range(1, days_in_month + 1):
-            date = datetime(year, month, day)
-            weekday = date.strftime('%a')  # 요일 (Mon, Tue, Wed, Thu, Fri, Sat, Sun)
-            date_str = date.strftime('%Y-%m-%d')
-            
-            # 공휴일 체크
-            if date_str in holidays_2025:
-                continue
+        return self.inflight.do(key, lambda: self._fetch_month_aggregates(year, month))
+    
+    def refresh_month_aggregates(self, year, month):
+        """캐시를 보지 않고 이전 달 집계를 새로 조회해 캐시 값을 덮어씀 (디스크 파일도 지우지 않고 교체)
+        
+        같은 달을 조회 중인 요청이 있으면 그 결과를 함께 씀
+        """
+        return self.inflight.do((year, month), lambda: self._fetch_month_aggregates(year, month))
+    
+    def get_versioned_month_aggregates(self, year, month):
+        """이전 달 집계와 데이터 버전 ((사용자별, 지점별), (내용 해시, 조회 시각)) - 캐시에 있으면 DB를 조회하지 않음
+        
+        조회에 실패하면 버전은 None
+        """
+        aggregates = self.get_month_aggregates(year, month)
+        if None in aggregates:
+            return aggregates, None
+        version = self.cache.version((year, month)) if self.cache is not None else None
+        if version is None:
+            # 캐시를 쓰지 않거나 캐시 용량보다 커서 저장되지 않은 경우
+            version = (_digest(pickle.dumps(aggregates, protocol=pickle.HIGHEST_PROTOCOL)), time.time())
+        return aggregates, version
+    
+    def _fetch_month_aggregates(self, year, month):
+        """get_month_aggregates에서 캐시에 없을 때 실제로 조회하고 캐시에 저장"""
+        key = (year, month)
+        if self.has_local_source():
+            prev_month_data, branch_weekday_data = self.get_local_month_data(year, month)
+        else:
+            prev_month_data, branch_weekday_data = self.get_combined_month_data(year, month)
+        
+        # 조회에 실패한 결과는 캐시하지 않음
+        if self.cache is not None and prev_month_data is not None and branch_weekday_data is not None:
+            self.cache.set(key, (prev_month_data, branch_weekday_data),
+                           permanent=self.is_closed_month(year, month))
+        
+        return prev_month_data, branch_weekday_data
+    
+    async def get_month_aggregates_async(self, year, month):
+        """get_month_aggregates의 비동기 버전 - DB 조회는 스레드 풀에서 실행해 이벤트 루프를 막지 않음
+        
+        동기 경로와 같은 통합 쿼리로 이전 달 기록을 한 번만 스캔
+        """
+        if self.snapshot_dir is not None:
+            # 스냅샷은 로컬 파일만 읽으므로 연결이 필요 없음
+            return self.get_month_aggregates(year, month)
+        if self.rollup is not None:
+            # 롤업을 쓰면 무거운 집계 쿼리가 없으므로 연결 하나로 동기 경로를 그대로 실행
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.db.executor, self._get_month_aggregates_in_session, year, month)
+        
+        key = (year, month)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        # 같은 달을 동시에 요청하면 쿼리는 한 번만 실행 (조정 팩터는 요청마다 build_mission_result에서 적용)
+        return await self.inflight.do_async(key, lambda: self._fetch_month_aggregates_async(year, month))
+    
+    async def _fetch_month_aggregates_async(self, year, month):
+        """get_month_aggregates_async에서 캐시에 없을 때 연결 하나로 통합 쿼리를 실행하고 캐시에 저장"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.db.executor, self._fetch_month_aggregates_in_session, year, month)
+    
+    def _fetch_month_aggregates_in_session(self, year, month):
+        with self.session() as session:
+            return session._fetch_month_aggregates(year, month)
+    
+    def _get_month_aggregates_in_session(self, year, month):
+        with self.session() as session:
+            return session.get_month_aggregates(year, month)
+    
+    def get_range_aggregates(self, months):
+        """여러 목표 월의 이전 달 집계를 한 번에 조회 - 캐시에 없는 달만 한 번의 기간 쿼리로 조회
+        
+        {(연도, 월): (사용자별 일별 결과, 지점별 요일별 결과)} 반환 (조회 실패한 달은 (None, None))
+        """
+        aggregates = {}
+        missing = []
+        for key in months:
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                aggregates[key] = cached
+            else:
+                missing.append(key)
+        
+        if missing:
+            if self.has_local_source():
+                monthly_data = {}
+                for year, month in missing:
+                    month_aggregates = self.get_local_month_data(year, month)
+                    if None in month_aggregates:
+                        monthly_data = None
+                        break
+                    monthly_data[self.shift_month(year, month, -1)] = month_aggregates
+            else:
+                start_date, _ = self.get_previous_month_range(*min(missing))
+                _, end_date = self.get_previous_month_range(*max(missing))
+                monthly_data = self.get_combined_range_data(start_date, end_date)
             
-            # 일요일 격주 운영 체크 (월의 첫째 주와 셋째 주만 운영)
-            if weekday == 'Sun':
-                week_number = (day - 1) // 7 + 1
-                if week_number not in [1, 3]:  # 첫째 주, 셋째 주만
+            for year, month in missing:
+                if monthly_data is None:
+                    aggregates[(year, month)] = (None, None)
                     continue
+                
+                source_month = self.shift_month(year, month, -1)
+                month_aggregates = monthly_data.get(source_month) or self._empty_month_aggregates()
+                aggregates[(year, month)] = month_aggregates
+                if self.cache is not None:
+                    self.cache.set((year, month), month_aggregates, permanent=self.is_closed_month(year, month))
+        
+        return aggregates
+    
+    def calculate_weekday_averages(self, data):
+        """요일별 평균 거리 계산"""
+        return self.calculate_weekday_breakdown(data, include_groups=False)['weekday_averages']
+    
+    def calculate_weekday_breakdown(self, data, include_groups=True):
+        """요일별 평균 거리를 열 단위 배열 연산으로 계산하고, 지점별·사용자별 요일 평균도 함께 계산
+        
+        평균은 모두 요일별 총 거리를 그 요일의 실제 일수(기록이 있는 날짜 수)로 나눈 일평균이라
+        지점별(또는 사용자별) 평균을 더하면 전체 평균과 같음 (include_groups=False면 요일별 평균만 계산)
+        """
+        breakdown = {
+            'weekday_averages': {},
+            'weekday_days': {},
+            'branch_weekday_averages': {},
+            'user_weekday_averages': {}
+        }
+        if not data or 'data' not in data or not len(data):
+            return breakdown
+        
+        weekday_labels, weekday_codes, weekday_days, distance_values = self._weekday_columns(data)
+        weekday_count = len(weekday_labels)
+        
+        # 요일별 총 거리 (bincount는 행 순서대로 더하므로 기존 반복문과 결과가 같음)
+        weekday_totals = np.bincount(weekday_codes, weights=distance_values, minlength=weekday_count)
+        
+        for code, weekday in enumerate(weekday_labels):
+            days = int(weekday_days[code])
+            breakdown['weekday_days'][weekday] = days
+            breakdown['weekday_averages'][weekday] = float(weekday_totals[code]) / days
+        
+        if not include_groups:
+            return breakdown
+        
+        # 지점별·사용자별 요일 합계 (그룹 코드 × 요일 수 + 요일 코드로 한 번에 집계)
+        for column, key in (('운동장소', 'branch_weekday_averages'), ('사용자_id', 'user_weekday_averages')):
+            labels, _, totals, counts = self._group_weekday_totals(data, column, weekday_codes, weekday_count,
+                                                                   distance_values)
             
-            business_days += 1
+            averages = {}
+            for group, label in enumerate(labels):
+                averages[label] = {
+                    weekday: float(totals[group, code]) / int(weekday_days[code])
+                    for code, weekday in enumerate(weekday_labels)
+                    if counts[group, code]
+                }
+            breakdown[key] = averages
+        
+        return breakdown
+    
+    def _weekday_columns(self, data):
+        """(요일 목록, 행별 요일 코드, 요일별 실제 일수, 행별 거리 float 배열)
         
-        return business_days
+        문자열/ID 열은 정수 코드로, 거리는 float 배열로 (저장된 열 배열에서 바로 계산)
+        요일별 실제 일수는 날짜별 첫 행의 요일 코드로 집계
+        """
+        weekday_labels, weekday_codes = data.factorize('요일')
+        _, date_codes = data.factorize('운동일')
+        distance_values = data.floats('총_운동_거리_km')
+        
+        _, first_rows = np.unique(date_codes, return_index=True)
+        weekday_days = np.bincount(weekday_codes[first_rows], minlength=len(weekday_labels))
+        return weekday_labels, weekday_codes, weekday_days, distance_values
+    
+    def _group_weekday_totals(self, data, column, weekday_codes, weekday_count, distance_values):
+        """column 값별 요일 합계를 한 번에 집계 (그룹 코드 × 요일 수 + 요일 코드)
+        
+        (그룹 목록, 행별 그룹 코드, 그룹×요일 거리 합계, 그룹×요일 행 수) 반환
+        """
+        labels, codes = data.factorize(column)
+        group_codes = codes * weekday_count + weekday_codes
+        size = len(labels) * weekday_count
+        totals = np.bincount(group_codes, weights=distance_values, minlength=size).reshape(-1, weekday_count)
+        counts = np.bincount(group_codes, minlength=size).reshape(-1, weekday_count)
+        return labels, codes, totals, counts
     
-    def calculate_mission_target(self, year, month, adjustment_factor=1.0):
-        """월간미션 목표 계산"""
-        # 1. 이전 달 데이터 조회
-        prev_month_data = self.get_previous_month_data(year, month)
-        branch_weekday_data = self.get_branch_weekday_data(year, month)
+    def calculate_branch_targets(self, data, weekday_business_days, adjustment_factor=1.0, branch_ids=None):
+        """지점(b_place_id)별 월간미션 목표 - 지점×요일 합계를 한 번에 집계해서 모든 지점을 함께 계산
+        
+        지점별 요일 평균(그 지점의 요일별 총 거리 / 그 요일의 실제 일수)에 요일별 영업일수를 곱해 더하므로
+        모든 지점의 예상 km를 더하면 전체 예상 km와 같음. branch_ids를 주면 그 지점만 반환 (지점 id 순)
+        """
+        if not data or 'data' not in data or not len(data):
+            return []
+        if '지점_id' not in data.columns:
+            print("⚠️ 지점 id가 없는 데이터라 지점별 목표를 계산할 수 없습니다. (이전 형식 스냅샷은 다시 저장하세요)")
+            return []
+        
+        weekday_labels, weekday_codes, weekday_days, distance_values = self._weekday_columns(data)
+        weekday_count = len(weekday_labels)
+        branch_labels, branch_codes, totals, counts = self._group_weekday_totals(
+            data, '지점_id', weekday_codes, weekday_count, distance_values
+        )
+        averages = totals / weekday_days
+        expected = averages @ np.array([weekday_business_days.get(weekday, 0) for weekday in weekday_labels])
+        
+        # 지점명은 지점마다 첫 행의 값
+        place_names, place_codes = data.factorize('운동장소')
+        _, first_rows = np.unique(branch_codes, return_index=True)
         
+        wanted = None if branch_ids is None else set(branch_ids)
+        targets = []
+        for code, branch_id in enumerate(branch_labels):
+            if wanted is not None and branch_id not in wanted:
+                continue
+            targets.append({
+                'branch_id': branch_id,
+                'branch_name': place_names[place_codes[first_rows[code]]] or '미지정',
+                'weekday_averages': {
+                    weekday: float(averages[code, weekday_code])
+                    for weekday_code, weekday in enumerate(weekday_labels)
+                    if counts[code, weekday_code]
+                },
+                'expected_km': round(float(expected[code]), 2),
+                'adjusted_target': round(float(expected[code]) * adjustment_factor, 2)
+            })
+        
+        targets.sort(key=lambda target: (target['branch_id'] is None, target['branch_id'] or 0))
+        return targets
+    
+    def get_business_days(self, year, month):
+        """특정 월의 영업일수 계산 (일요일 격주 운영, 공휴일 제외)"""
+        return self.business_calendar.get_business_days(year, month)
+    
+    def calculate_mission_target(self, year, month, adjustment_factor=1.0, branch_ids=None):
+        """월간미션 목표 계산 (branch_ids를 주면 지점별 목표는 그 지점만)"""
+        # 1. 이전 달 데이터 조회 (캐시에 있으면 DB 조회 없음)
+        with metrics.phase('calculate.db'):
+            prev_month_data, branch_weekday_data = self.get_month_aggregates(year, month)
+        
+        return self.build_mission_result(year, month, prev_month_data, branch_weekday_data, adjustment_factor,
+                                         branch_ids)
+    
+    async def calculate_mission_target_async(self, year, month, adjustment_factor=1.0, branch_ids=None):
+        """월간미션 목표 계산 (비동기 - DB 조회 중에도 이벤트 루프를 막지 않음)"""
+        with metrics.phase('calculate.db'):
+            prev_month_data, branch_weekday_data = await self.get_month_aggregates_async(year, month)
+        
+        return self.build_mission_result(year, month, prev_month_data, branch_weekday_data, adjustment_factor,
+                                         branch_ids)
+    
+    def calculate_mission_targets_range(self, start_year, start_month, end_year, end_month, adjustment_factor=1.0,
+                                        branch_ids=None):
+        """기간 내 모든 월의 월간미션 목표 계산 (필요한 이전 달 데이터는 한 번의 쿼리로 조회)"""
+        months = []
+        year, month = start_year, start_month
+        while (year, month) <= (end_year, end_month):
+            months.append((year, month))
+            year, month = self.shift_month(year, month, 1)
+        
+        aggregates = self.get_range_aggregates(months)
+        
+        return [
+            self.build_mission_result(year, month, *aggregates[(year, month)], adjustment_factor, branch_ids)
+            for year, month in months
+        ]
+    
+    def build_mission_result(self, year, month, prev_month_data, branch_weekday_data, adjustment_factor=1.0,
+                             branch_ids=None):
+        """이전 달 집계로 월간미션 목표 결과 구성 (전체 목표 + 지점별 목표)"""
         if not prev_month_data or 'data' not in prev_month_data:
             return {
                 'error': f'{year-1 if month == 1 else year}년 {month-1 if month > 1 else 12}월 데이터가 없습니다.'
             }
         
         # 2. 요일별 평균 거리 계산
-        weekday_averages = self.calculate_weekday_averages(prev_month_data)
+        with metrics.phase('calculate.weekday_averages'):
+            weekday_averages = self.calculate_weekday_averages(prev_month_data)
         
         # 3. 해당 월의 영업일수 계산
-        business_days = self.get_business_days(year, month)
+        with metrics.phase('calculate.business_days'):
+            business_days = self.get_business_days(year, month)
+            weekday_business_days = self.business_calendar.get_weekday_business_days(year, month)
         
         # 4. 예상 달성 km 계산
         total_expected_km = 0
-        weekday_business_days = {}
-        
-        # 요일별 영업일수 계산
-        days_in_month = calendar.monthrange(year, month)[1]
-        for day in range(1, days_in_month + 1):
-            date = datetime(year, month, day)
-            weekday = date.strftime('%a')
-            date_str = date.strftime('%Y-%m-%d')
-            
-            # 공휴일 체크
-            holidays_2025 = [
-                '2025-01-01', '2025-01-28', '2025-01-29', '2025-01-30',
-                '2025-03-01', '2025-05-05', '2025-05-12', '2025-06-06',
-                '2025-08-15', '2025-10-05', '2025-10-06', '2025-10-07',
-                '2025-10-03', '2025-10-09', '2025-12-25'
-            ]
-            
-            if date_str in holidays_2025:
-                continue
-            
-            # 일요일 격주 운영 체크
-            if weekday == 'Sun':
-                week_number = (day - 1) // 7 + 1
-                if week_number not in [1, 3]:
-                    continue
-            
-            if weekday not in weekday_business_days:
-                weekday_business_days[weekday] = 0
-            weekday_business_days[weekday] += 1
         
         # 요일별 예상 거리 계산
         for weekday, days in weekday_business_days.items():
@@ -256,16 +1028,22 @@ class MonthlyMissionCalculator:
         # 5. 조정 팩터 적용
         adjusted_target = total_expected_km * adjustment_factor
         
+        # 6. 지점별 목표 (같은 데이터를 지점×요일로 한 번에 집계)
+        with metrics.phase('calculate.branch_targets'):
+            branch_targets = self.calculate_branch_targets(prev_month_data, weekday_business_days, adjustment_factor,
+                                                           branch_ids)
+        
         return {
             'year': year,
             'month': month,
             'previous_month_data': {
                 'year': year-1 if month == 1 else year,
                 'month': month-1 if month > 1 else 12,
-                'total_records': len(prev_month_data['data']),
+                'total_records': len(prev_month_data),
                 'weekday_averages': weekday_averages
             },
-            'branch_weekday_data': branch_weekday_data['data'] if branch_weekday_data and 'data' in branch_weekday_data else [],
+            'branch_weekday_data': branch_weekday_data.rows() if branch_weekday_data else [],
+            'branch_targets': branch_targets,
             'business_days': business_days,
             'weekday_business_days': weekday_business_days,
             'expected_km': round(total_expected_km, 2),
@@ -274,62 +1052,484 @@ class MonthlyMissionCalculator:
         }
 
 # Flask API 엔드포인트
-calculator = MonthlyMissionCalculator()
+# MISSION_CACHE_DIR을 지정하면 마감된 달의 집계가 디스크에 저장되어 재시작 후에도 유지됨
+# MISSION_ROLLUP_PATH를 지정하면 원본 기록 대신 일별 롤업에서 집계 (python3 daily_rollup.py refresh로 갱신)
+# MISSION_SNAPSHOT_DIR을 지정하면 DB 없이 로컬 스냅샷으로만 계산 (python3 monthly_mission_calculator.py snapshot으로 저장)
+# 지점/사용자 이름은 MISSION_NAME_CACHE_TTL초(기본 10분)마다 새로 조회
+calculator = MonthlyMissionCalculator(
+    cache=MonthlyDataCache(
+        max_bytes=int(os.environ.get('MISSION_CACHE_MAX_MB', 64)) * 1024 * 1024,
+        ttl=int(os.environ.get('MISSION_CACHE_TTL', 300)),
+        cache_dir=os.environ.get('MISSION_CACHE_DIR') or None
+    ),
+    rollup=DailyRollup(os.environ['MISSION_ROLLUP_PATH']) if os.environ.get('MISSION_ROLLUP_PATH') else None,
+    snapshot_dir=os.environ.get('MISSION_SNAPSHOT_DIR') or None,
+    names=DimensionCache(ttl=int(os.environ.get('MISSION_NAME_CACHE_TTL', 600)))
+)
 
-@app.route('/')
+# 데이터 월이 마감되면 다음 목표 월 집계를 미리 조회해 캐시에 저장 (precompute.py)
+# MISSION_PRECOMPUTE=1이면 백그라운드 스레드로 MISSION_PRECOMPUTE_INTERVAL초마다 확인
+# (워커마다 스레드가 뜨지만 캐시 디렉터리의 잠금 파일을 가진 워커 하나만 DB를 조회)
+scheduler = PrecomputeScheduler(
+    calculator,
+    retries=int(os.environ.get('MISSION_PRECOMPUTE_RETRIES', 3)),
+    retry_delay=int(os.environ.get('MISSION_PRECOMPUTE_RETRY_DELAY', 60)),
+    interval=int(os.environ.get('MISSION_PRECOMPUTE_INTERVAL', 3600)),
+    lock_path=os.path.join(calculator.cache.cache_dir, '.precompute.lock') if calculator.cache.cache_dir else None
+)
+
+def init_db_pool():
+    """현재 프로세스의 커넥션 풀 생성 (gunicorn은 워커마다 fork 직후 호출)
+    
+    요청마다 새로 연결하지 않고 풀에서 연결을 빌려 사용 (멀티스레드 워커에서도 안전)
+    """
+    calculator.db.close_pool()
+    calculator.db.init_pool(
+        minconn=int(os.environ.get('DB_POOL_MIN', 1)),
+        maxconn=int(os.environ.get('DB_POOL_MAX', 10)),
+        idle_timeout=int(os.environ.get('DB_POOL_IDLE_TIMEOUT', 300))
+    )
+
+def start_precompute_scheduler():
+    """MISSION_PRECOMPUTE=1이면 현재 프로세스에서 미리 계산 스레드 시작 (gunicorn은 워커마다 fork 직후 호출)
+    
+    결과를 워커끼리 공유할 디스크 캐시(MISSION_CACHE_DIR)가 있어야 하며, 실제 계산은 잠금을 가진 워커 하나만 함
+    """
+    if os.environ.get('MISSION_PRECOMPUTE') != '1':
+        return
+    if scheduler.lock_path is None:
+        print("⚠️ MISSION_CACHE_DIR이 없어 목표 미리 계산을 시작하지 않습니다. (워커끼리 결과를 공유할 디스크 캐시 필요)")
+        return
+    scheduler.start()
+
+def create_app():
+    """Flask 앱 생성 (gunicorn: "monthly_mission_calculator:create_app()")"""
+    app = Flask(__name__)
+    CORS(app)
+    app.register_blueprint(api)
+    
+    if calculator.db.pool is None:
+        init_db_pool()
+    
+    return app
+
+@api.route('/')
 def index():
     """메인 페이지"""
     return render_template('index.html')
 
-@app.route('/api/calculate', methods=['POST'])
-def calculate_mission():
-    """월간미션 계산 API"""
+def _parse_branch_ids(value):
+    """branch_ids 파라미터 (id 목록 또는 "1,2,3" 문자열) -> 정렬된 지점 id 목록 (없으면 None = 모든 지점, 형식이 틀리면 ValueError)"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    try:
+        return sorted({int(branch_id) for branch_id in value})
+    except (TypeError, ValueError):
+        raise ValueError('branch_ids는 지점 id 목록이나 "1,2,3" 형식이어야 합니다.') from None
+
+def _parse_calculate_params(params):
+    """계산 API 파라미터 -> (year, month, adjustment_factor, branch_ids) (빠졌거나 형식이 틀리면 ValueError)"""
+    try:
+        year = int(params.get('year'))
+        month = int(params.get('month'))
+        adjustment_factor = float(params.get('adjustment_factor', 1.0))
+    except (TypeError, ValueError):
+        raise ValueError('year와 month는 정수, adjustment_factor는 숫자여야 합니다.') from None
+    if not 1 <= month <= 12:
+        raise ValueError('month는 1 ~ 12 사이여야 합니다.')
+    return year, month, adjustment_factor, _parse_branch_ids(params.get('branch_ids'))
+
+@api.route('/api/calculate', methods=['POST'])
+async def calculate_mission():
+    """월간미션 계산 API (이전 달 기록을 통합 쿼리로 한 번만 스캔, branch_ids로 지점별 목표 필터)"""
+    try:
+        params = _parse_calculate_params(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    year, month, adjustment_factor, branch_ids = params
+    
+    try:
+        with metrics.phase('calculate.total'):
+            result = await calculator.calculate_mission_target_async(year, month, adjustment_factor, branch_ids)
+            with metrics.phase('calculate.serialize'):
+                response = jsonify(result)
+        return response
+    
+    except PoolError:
+        return jsonify({'error': '데이터베이스 연결 실패'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# 마감된 달 응답을 서버에 다시 묻지 않고 쓰는 시간 (초, 기본 하루) - 지나면 ETag로 다시 확인
+# 마감된 달의 데이터는 바뀌지 않고, 공휴일(holidays.json)/응답 형태가 바뀌면 ETag가 달라지므로 하루 안에 반영됨
+CLOSED_MONTH_MAX_AGE = int(os.environ.get('MISSION_CLOSED_MAX_AGE', 86400))
+# max-age가 지난 뒤에도 이 시간 동안은 이전 응답을 바로 쓰고 뒤에서 ETag로 다시 확인 (stale-while-revalidate)
+CLOSED_MONTH_STALE_WHILE_REVALIDATE = int(os.environ.get('MISSION_CLOSED_STALE_WHILE_REVALIDATE', 7 * 86400))
+
+# 응답 형태 버전 (ETag에 포함 - 응답에 필드가 추가/변경되면 올려서 이전 ETag로 304를 받지 않게 함)
+# v2: 계산 결과에 branch_targets 추가
+RESPONSE_FORMAT = 'v2'
+
+def _etag(*parts):
+    """응답 ETag (응답 형태 버전, 이전 달 데이터 버전, 응답에 영향을 주는 요청 값으로 결정)"""
+    return _digest(json.dumps((RESPONSE_FORMAT,) + parts, sort_keys=True, default=str).encode('utf-8'))
+
+def _set_cache_headers(response, etag, modified_at, closed, private=False, vary=None):
+    """ETag/Last-Modified/Cache-Control(/Vary) 설정
+    
+    마감된 달은 CLOSED_MONTH_MAX_AGE초 동안 재사용 (그 뒤 stale-while-revalidate), 진행 중인 달은 no-cache(매번 ETag로 확인)
+    사용자 이름이 들어 있는 응답은 private(브라우저만 저장)
+    """
+    response.set_etag(etag)
+    response.last_modified = datetime.fromtimestamp(modified_at, timezone.utc)
+    if vary:
+        response.vary.add(vary)
+    if private:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    if closed:
+        response.cache_control.max_age = CLOSED_MONTH_MAX_AGE
+        # werkzeug 2.x에는 속성이 없으므로 지시어 이름으로 설정
+        response.cache_control['stale-while-revalidate'] = CLOSED_MONTH_STALE_WHILE_REVALIDATE
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+def _not_modified(etag, modified_at, closed, private=False, vary=None):
+    """If-None-Match가 현재 ETag와 맞으면 304 응답 (다르면 None)
+    
+    Last-Modified는 이전 달 데이터 기준이라 공휴일/응답 형태 변경을 반영하지 못하므로 If-Modified-Since로는 판단하지 않음
+    """
+    if is_resource_modified(request.environ, etag=etag):
+        return None
+    return _set_cache_headers(Response(status=304), etag, modified_at, closed, private, vary)
+
+@api.route('/api/calculate', methods=['GET'])
+def calculate_mission_cacheable():
+    """월간미션 계산 API (GET - ?year=&month=&adjustment_factor=&branch_ids=1,2, HTTP 캐시 가능)
+    
+    이전 달 데이터 버전이 같으면 ETag도 같으므로 If-None-Match가 맞으면 계산 없이 304 반환
+    """
+    try:
+        params = _parse_calculate_params(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    year, month, adjustment_factor, branch_ids = params
+    
+    try:
+        with metrics.phase('calculate.total'), calculator.session() as session:
+            with metrics.phase('calculate.db'):
+                aggregates, version = session.get_versioned_month_aggregates(year, month)
+            if version is None:
+                return jsonify(session.build_mission_result(year, month, *aggregates, adjustment_factor, branch_ids))
+            
+            closed = session.is_closed_month(year, month)
+            etag = _etag('calculate', version[0], session.business_calendar.get_weekday_business_days(year, month),
+                         adjustment_factor, branch_ids)
+            not_modified = _not_modified(etag, version[1], closed)
+            if not_modified is not None:
+                return not_modified
+            
+            result = session.build_mission_result(year, month, *aggregates, adjustment_factor, branch_ids)
+            with metrics.phase('calculate.serialize'):
+                response = jsonify(result)
+        return _set_cache_headers(response, etag, version[1], closed)
+    
+    except PoolError:
+        return jsonify({'error': '데이터베이스 연결 실패'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """쿼리/처리 단계별 시간 통계 API (초기화는 POST /api/metrics/reset)"""
+    result = metrics.snapshot()
+    result['pool'] = calculator.db.pool.stats() if calculator.db.pool else None
+    result['cache'] = calculator.cache.stats() if calculator.cache is not None else None
+    result['name_cache'] = calculator.names.stats()
+    result['coalesced'] = calculator.inflight.stats()
+    result['precompute'] = scheduler.stats()
+    return jsonify(result)
+
+@api.route('/api/metrics/reset', methods=['POST'])
+def reset_metrics():
+    """통계 초기화 API (Authorization: Bearer <METRICS_RESET_TOKEN>, 토큰을 설정하지 않으면 사용 불가)
+    
+    초기화 직전 통계를 반환
+    """
+    token = os.environ.get('METRICS_RESET_TOKEN')
+    if not token:
+        return jsonify({'error': '통계 초기화가 설정되지 않았습니다. (METRICS_RESET_TOKEN)'}), 403
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'error': '인증이 필요합니다.'}), 401
+    
+    result = metrics.snapshot()
+    metrics.reset()
+    return jsonify(result)
+
+# 한 번에 계산할 수 있는 최대 개월 수
+MAX_RANGE_MONTHS = 36
+
+@api.route('/api/calculate/range', methods=['POST'])
+def calculate_mission_range():
+    """기간별 월간미션 일괄 계산 API"""
     try:
         data = request.get_json()
-        year = int(data.get('year'))
-        month = int(data.get('month'))
+        start_year = int(data.get('start_year'))
+        start_month = int(data.get('start_month'))
+        end_year = int(data.get('end_year'))
+        end_month = int(data.get('end_month'))
         adjustment_factor = float(data.get('adjustment_factor', 1.0))
+        try:
+            branch_ids = _parse_branch_ids(data.get('branch_ids'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if not calculator.connect():
-            return jsonify({'error': '데이터베이스 연결 실패'}), 500
+        month_count = (end_year * 12 + end_month) - (start_year * 12 + start_month) + 1
+        if not (1 <= start_month <= 12 and 1 <= end_month <= 12) or month_count < 1:
+            return jsonify({'error': '시작 연월이 종료 연월보다 늦거나 월이 올바르지 않습니다.'}), 400
+        if month_count > MAX_RANGE_MONTHS:
+            return jsonify({'error': f'최대 {MAX_RANGE_MONTHS}개월까지 한 번에 계산할 수 있습니다.'}), 400
         
-        try:
-            result = calculator.calculate_mission_target(year, month, adjustment_factor)
-            return jsonify(result)
-        finally:
-            calculator.disconnect()
+        with calculator.session() as session:
+            results = session.calculate_mission_targets_range(
+                start_year, start_month, end_year, end_month, adjustment_factor, branch_ids
+            )
+        
+        return jsonify({
+            'success': True,
+            'month_count': len(results),
+            'results': results
+        })
     
+    except PoolError:
+        return jsonify({'error': '데이터베이스 연결 실패'}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/previous-month-data', methods=['POST'])
-def get_previous_month_data():
-    """이전 달 데이터 조회 API"""
+# /api/previous-month-data 한 페이지의 기본/최대 행 수 (columnar 형식)
+PREVIOUS_MONTH_PAGE_SIZE = 10000
+PREVIOUS_MONTH_MAX_PAGE_SIZE = 50000
+# 이 크기 이상인 응답만 압축
+COMPRESS_MIN_BYTES = 1024
+
+def _dumps(payload):
+    """JSON 바이트로 직렬화 (orjson이 있으면 사용, Decimal 등은 문자열로)"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=str)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+def _response_encoding():
+    """클라이언트가 받을 수 있는 압축 방식 ('br', 'gzip' 또는 None)"""
+    accept_encoding = request.headers.get('Accept-Encoding', '').lower()
+    if brotli is not None and 'br' in accept_encoding:
+        return 'br'
+    if 'gzip' in accept_encoding:
+        return 'gzip'
+    return None
+
+def _json_response(payload, status=200):
+    """JSON 응답 (클라이언트가 받을 수 있으면 brotli 또는 gzip으로 압축)"""
+    body = _dumps(payload)
+    headers = {'Vary': 'Accept-Encoding'}
+    encoding = _response_encoding()
+    if len(body) >= COMPRESS_MIN_BYTES and encoding is not None:
+        if encoding == 'br':
+            body = brotli.compress(body, quality=5)
+        else:
+            # mtime=0: 같은 본문이면 압축 결과도 같아야 강한 ETag가 맞음
+            body = gzip.compress(body, compresslevel=3, mtime=0)
+        headers['Content-Encoding'] = encoding
+    return Response(body, status=status, mimetype='application/json', headers=headers)
+
+def _encode_cursor(year, month, offset, data_version):
+    """다음 페이지 커서 (요청 연월, 시작 위치, 데이터 내용 해시를 담은 불투명 문자열)"""
+    return base64.urlsafe_b64encode(f"{year}-{month}:{offset}:{data_version}".encode()).decode().rstrip('=')
+
+def _decode_cursor(cursor, year, month):
+    """커서에서 (시작 위치, 데이터 내용 해시) 꺼내기 (다른 연월의 커서이거나 형식이 틀리면 ValueError)"""
     try:
-        data = request.get_json()
-        year = int(data.get('year'))
-        month = int(data.get('month'))
-        
-        if not calculator.connect():
-            return jsonify({'error': '데이터베이스 연결 실패'}), 500
-        
+        text = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        cursor_month, offset, data_version = text.split(':')
+        offset = int(offset)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError('올바르지 않은 커서입니다.') from e
+    if cursor_month != f"{year}-{month}":
+        raise ValueError('다른 연월의 커서입니다.')
+    return offset, data_version
+
+def _previous_month_data_response(params, cacheable=False):
+    """이전 달 데이터 조회 응답 (POST 본문 / GET 쿼리 문자열 공통)
+    
+    - format: 'rows'(기본, 행 배열) 또는 'columnar'(열별 배열, 문자열 열은 사전 인코딩)
+    - limit/cursor: 페이지 단위 조회 (응답의 next_cursor를 다음 요청의 cursor로 전달, 마지막 페이지면 null)
+      columnar는 limit이 없으면 PREVIOUS_MONTH_PAGE_SIZE행씩, rows는 limit이 없으면 전체 반환
+    - cacheable: ETag/Cache-Control을 붙이고 조건부 요청이면 304 반환
+    """
+    try:
+        year = int(params.get('year'))
+        month = int(params.get('month'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'year와 month는 정수여야 합니다.'}), 400
+    if not 1 <= month <= 12:
+        return jsonify({'error': 'month는 1 ~ 12 사이여야 합니다.'}), 400
+    response_format = params.get('format', 'rows')
+    if response_format not in ('rows', 'columnar'):
+        return jsonify({'error': "format은 'rows' 또는 'columnar'여야 합니다."}), 400
+    
+    limit = params.get('limit')
+    if limit is None and response_format == 'columnar':
+        limit = PREVIOUS_MONTH_PAGE_SIZE
+    if limit is not None:
         try:
-            result = calculator.get_previous_month_data(year, month)
-            if result and 'data' in result:
-                return jsonify({
-                    'success': True,
-                    'data': result['data'],
-                    'columns': result['columns'],
-                    'row_count': result['row_count']
-                })
-            else:
-                return jsonify({'error': '데이터를 찾을 수 없습니다.'}), 404
-        finally:
-            calculator.disconnect()
+            limit = int(limit)
+        except (TypeError, ValueError):
+            limit = None
+        if limit is None or not 1 <= limit <= PREVIOUS_MONTH_MAX_PAGE_SIZE:
+            return jsonify({'error': f'limit은 1 ~ {PREVIOUS_MONTH_MAX_PAGE_SIZE} 사이여야 합니다.'}), 400
+    
+    # 캐시/동시 요청 합치기를 거친 월별 집계를 쓰므로 페이지마다 쿼리를 다시 실행하지 않음
+    with calculator.session() as session:
+        (result, _), version = session.get_versioned_month_aggregates(year, month)
+        closed = session.is_closed_month(year, month)
+    
+    if not result or 'data' not in result:
+        return jsonify({'error': '데이터를 찾을 수 없습니다.'}), 404
+    
+    row_count = len(result)
+    offset = 0
+    cursor = params.get('cursor')
+    if cursor:
+        try:
+            offset, cursor_version = _decode_cursor(cursor, year, month)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not 0 <= offset <= row_count:
+            return jsonify({'error': '올바르지 않은 커서입니다.'}), 400
+        if cursor_version != version[0]:
+            # 진행 중인 달의 캐시가 만료되어 다시 조회한 경우
+            return jsonify({'error': '데이터가 갱신되었습니다. 처음부터 다시 조회하세요.'}), 409
+    
+    if cacheable:
+        # 압축 방식마다 본문이 다르므로 ETag도 구분
+        # 사용자 이름이 들어 있으므로 공유 캐시(프록시)에는 저장하지 않음
+        etag = _etag('previous-month-data', version[0], response_format, limit, offset, _response_encoding())
+        not_modified = _not_modified(etag, version[1], closed, private=True, vary='Accept-Encoding')
+        if not_modified is not None:
+            return not_modified
+    
+    end = row_count if limit is None else min(offset + limit, row_count)
+    page = result[offset:end]
+    with metrics.phase('previous_month_data.serialize'):
+        response = _json_response({
+            'success': True,
+            'format': response_format,
+            'columns': page.columns,
+            'data': page.to_json_columns() if response_format == 'columnar' else page.rows(),
+            'row_count': row_count,
+            'offset': offset,
+            'page_row_count': len(page),
+            'next_cursor': _encode_cursor(year, month, end, version[0]) if end < row_count else None
+        })
+    if cacheable:
+        _set_cache_headers(response, etag, version[1], closed, private=True)
+    return response
+
+@api.route('/api/previous-month-data', methods=['POST'])
+def get_previous_month_data():
+    """이전 달 데이터 조회 API (요청 본문: year, month, format, limit, cursor)"""
+    try:
+        return _previous_month_data_response(request.get_json())
     
+    except PoolError:
+        return jsonify({'error': '데이터베이스 연결 실패'}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api.route('/api/previous-month-data', methods=['GET'])
+def get_previous_month_data_cacheable():
+    """이전 달 데이터 조회 API (GET - 쿼리 문자열로 같은 파라미터 전달, HTTP 캐시 가능)"""
+    try:
+        return _previous_month_data_response(request.args, cacheable=True)
+    
+    except PoolError:
+        return jsonify({'error': '데이터베이스 연결 실패'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def save_snapshot_main(argv):
+    """스냅샷 저장 CLI: python3 monthly_mission_calculator.py snapshot 2025-01 2025-12 --dir snapshots"""
+    parser = argparse.ArgumentParser(prog='monthly_mission_calculator.py snapshot',
+                                     description='월별 집계를 로컬 Parquet 스냅샷으로 저장 (데이터 월 기준)')
+    parser.add_argument('start', help='시작 월 (YYYY-MM)')
+    parser.add_argument('end', help='종료 월 (YYYY-MM)')
+    parser.add_argument('--dir', default=os.environ.get('MISSION_SNAPSHOT_DIR') or 'snapshots', help='스냅샷 디렉터리')
+    args = parser.parse_args(argv)
+    
+    start_year, start_month = (int(part) for part in args.start.split('-'))
+    end_year, end_month = (int(part) for part in args.end.split('-'))
+    
+    snapshot_calculator = MonthlyMissionCalculator(snapshot_dir=args.dir)
+    if not snapshot_calculator.connect():
+        return
+    try:
+        saved = snapshot_calculator.save_snapshot(start_year, start_month, end_year, end_month)
+    finally:
+        snapshot_calculator.disconnect()
+    
+    if saved is None:
+        print("❌ 스냅샷 저장 실패")
+    else:
+        print(f"✅ {saved}개월 스냅샷을 저장했습니다: {args.dir}")
+
+def _year_month_arg(value):
+    """argparse용 YYYY-MM 변환 -> (연도, 월)"""
+    try:
+        year, month = (int(part) for part in value.split('-'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"YYYY-MM 형식이 아닙니다: {value}")
+    if not 1 <= month <= 12 or not 1 <= year <= 9999:
+        raise argparse.ArgumentTypeError(f"올바른 연월이 아닙니다: {value}")
+    return year, month
+
+def precompute_main(argv):
+    """목표 미리 계산 CLI: python3 monthly_mission_calculator.py precompute [2025-03] [--force] (cron용)"""
+    parser = argparse.ArgumentParser(prog='monthly_mission_calculator.py precompute',
+                                     description='데이터 월이 마감된 목표 월의 집계를 미리 조회해 캐시에 저장 (목표 월 기준)')
+    parser.add_argument('month', nargs='?', type=_year_month_arg,
+                        help='목표 월 (YYYY-MM, 기본: 데이터 월이 마감된 최근 달)')
+    parser.add_argument('--force', action='store_true', help='이미 미리 계산한 달도 다시 계산')
+    args = parser.parse_args(argv)
+    
+    # 디스크 캐시가 없으면 조회 결과가 이 프로세스와 함께 사라지므로 쿼리를 실행하지 않음
+    if calculator.cache.cache_dir is None:
+        print("❌ MISSION_CACHE_DIR을 지정하세요. (미리 조회한 집계를 서버 워커와 공유할 디스크 캐시)")
+        sys.exit(1)
+    
+    year, month = args.month or scheduler.due_month()
+    if not args.force and scheduler.is_precomputed(year, month):
+        print(f"✅ {year}년 {month}월 목표는 이미 미리 계산되어 있습니다.")
+        return
+    
+    init_db_pool()
+    try:
+        record = scheduler.precompute(year, month)
+    finally:
+        calculator.db.close_pool()
+    if not record['success']:
+        sys.exit(1)
+
 if __name__ == '__main__':
-    port = int(os.environ.get('PORT', 8080))
-    app.run(debug=False, host='0.0.0.0', port=port)
+    if sys.argv[1:2] == ['snapshot']:
+        save_snapshot_main(sys.argv[2:])
+    elif sys.argv[1:2] == ['precompute']:
+        precompute_main(sys.argv[2:])
+    else:
+        # 개발용 서버 (운영 환경은 gunicorn.conf.py 참고)
+        port = int(os.environ.get('PORT', 8080))
+        app = create_app()
+        start_precompute_scheduler()
+        app.run(debug=False, host='0.0.0.0', port=port)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""다음 달 목표 미리 계산
+
+데이터 월이 마감되면(다음 달 1일 + 유예 시간) 그 달로 계산하는 목표 월의 집계를 새로 조회해
+월별 집계 캐시에 저장 (미리 만드는 것은 집계뿐이고, 목표/지점별 목표는 요청마다 집계에서 수 ms 안에 계산).
+첫 화면 요청은 DB 조회 없이 캐시된 집계로 바로 계산됨 (MISSION_CACHE_DIR을 지정하면 디스크에
+저장되어 모든 워커와 재시작 후에도 공유).
+
+사용법:
+    python3 monthly_mission_calculator.py precompute              # 마감된 최근 달 (이미 계산했으면 건너뜀)
+    python3 monthly_mission_calculator.py precompute 2025-03 --force
+    MISSION_PRECOMPUTE=1 gunicorn ...                            # 백그라운드 스레드로 주기적으로 확인
+
+서버에서 실행하면 워커마다 스레드가 뜨지만, 캐시 디렉터리의 잠금 파일을 가진 워커 하나만 계산함
+(그 워커가 재시작되면 다음 확인 때 다른 워커가 잠금을 넘겨받음). 서버가 여러 대면 한 대에서만 켜거나 cron으로 실행.
+"""
+
+from query_metrics import metrics
+from collections import deque
+from datetime import datetime
+import os
+import threading
+import time
+
+class PrecomputeScheduler:
+    """목표 월 집계 미리 계산 (run_once: cron 등에서 한 번 실행, start: 백그라운드 스레드로 interval초마다 확인)
+    
+    실패하면 retry_delay초부터 두 배씩 늘려가며 retries번까지 다시 시도하고,
+    시도 횟수와 소요 시간은 history(/api/metrics의 precompute)에 기록
+    lock_path를 주면 같은 파일을 잠근 프로세스 하나의 스레드만 계산 (나머지는 확인할 때마다 잠금만 시도)
+    """
+    def __init__(self, calculator, retries=3, retry_delay=60, interval=3600, lock_path=None):
+        self.calculator = calculator
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.interval = interval
+        self.lock_path = lock_path
+        self.history = deque(maxlen=24)  # 최근 실행 결과
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock_file = None  # 잠금을 가진 동안 열어 두는 파일 (프로세스가 끝나면 잠금도 풀림)
+    
+    def due_month(self, now=None):
+        """데이터 월이 마감된 가장 최근 목표 월 (year, month)"""
+        closed_at = (now or datetime.now()) - self.calculator.CLOSED_MONTH_GRACE
+        return closed_at.year, closed_at.month
+    
+    def is_precomputed(self, year, month):
+        """데이터 월이 마감된 뒤에 조회한 집계가 캐시(디스크 포함)에 있는지 여부"""
+        cache = self.calculator.cache
+        if cache is None:
+            return False
+        version = cache.version((year, month))
+        closed_at = datetime(year, month, 1) + self.calculator.CLOSED_MONTH_GRACE
+        return version is not None and version[1] >= closed_at.timestamp()
+    
+    def _compute(self, year, month):
+        """집계를 새로 조회해 캐시에 저장 (실패 시 예외)
+        
+        마감 전에 캐시된(만료 시간이 있는) 값은 새 값으로 덮어써서 만료 없이 저장됨
+        (기존 디스크 파일을 먼저 지우지 않으므로 다른 워커는 교체되기 전까지 이전 파일을 읽음)
+        """
+        with self.calculator.session() as session:
+            with metrics.phase('precompute.db'):
+                prev_month_data, branch_weekday_data = session.refresh_month_aggregates(year, month)
+        if prev_month_data is None or branch_weekday_data is None:
+            raise RuntimeError('이전 달 데이터 조회 실패')
+        
+        return {
+            'rows': len(prev_month_data),
+            'branch_weekday_rows': len(branch_weekday_data)
+        }
+    
+    def precompute(self, year, month):
+        """목표 월 미리 계산 (실패하면 재시도) - 실행 결과 dict 반환 (모든 시도가 실패하면 success=False)"""
+        record = {
+            'year': year,
+            'month': month,
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'success': False,
+            'attempts': 0,
+            'error': None
+        }
+        if self.calculator.cache is None:
+            record['error'] = '결과를 저장할 캐시가 없습니다.'
+            print(f"⚠️ {year}년 {month}월 목표 미리 계산 건너뜀: {record['error']}")
+            return record
+        
+        started = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            if attempt:
+                delay = self.retry_delay * 2 ** (attempt - 1)
+                print(f"⚠️ {year}년 {month}월 목표 미리 계산 실패 ({record['error']}) - {delay}초 후 다시 시도")
+                if self._stop.wait(delay):
+                    break
+            
+            record['attempts'] = attempt + 1
+            attempt_started = time.perf_counter()
+            try:
+                with metrics.phase('precompute.attempt'):
+                    record.update(self._compute(year, month))
+                record['success'] = True
+                record['error'] = None
+            except Exception as e:
+                record['error'] = str(e)
+            record['attempt_ms'] = round((time.perf_counter() - attempt_started) * 1000, 1)
+            if record['success']:
+                break
+        
+        record['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        with self._lock:
+            self.history.append(record)
+        
+        if record['success']:
+            print(f"✅ {year}년 {month}월 목표용 집계를 미리 조회했습니다: {record['rows']:,}행, "
+                  f"{record['attempt_ms']:,.0f}ms ({record['attempts']}번째 시도)")
+        else:
+            print(f"❌ {year}년 {month}월 목표 미리 계산 실패: {record['error']} ({record['attempts']}번 시도)")
+        return record
+    
+    def run_once(self, now=None):
+        """마감된 최근 달을 아직 미리 계산하지 않았으면 계산 (계산했으면 실행 결과, 건너뛰면 None)"""
+        year, month = self.due_month(now)
+        if self.is_precomputed(year, month):
+            return None
+        return self.precompute(year, month)
+    
+    def start(self):
+        """백그라운드 스레드 시작 (이미 실행 중이면 무시)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='precompute', daemon=True)
+            self._thread.start()
+    
+    def stop(self):
+        """백그라운드 스레드 중지 (재시도 대기 중이면 바로 끝냄)"""
+        self._stop.set()
+    
+    def _acquire_lock(self):
+        """계산을 맡을 프로세스 잠금 (이미 가졌거나 lock_path가 없으면 True, 다른 프로세스가 가졌으면 False)"""
+        if self.lock_path is None or self._lock_file is not None:
+            return True
+        try:
+            import fcntl
+        except ImportError:
+            print("⚠️ 파일 잠금을 쓸 수 없는 환경이라 프로세스마다 미리 계산합니다.")
+            self.lock_path = None
+            return True
+        
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        print(f"✅ 이 프로세스(pid {os.getpid()})가 목표 미리 계산을 맡습니다.")
+        return True
+    
+    def _release_lock(self):
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+    
+    def _run(self):
+        try:
+            while True:
+                try:
+                    # 잠금을 가진 프로세스 하나만 계산 (여러 워커가 같은 달을 중복 조회하지 않음)
+                    if self._acquire_lock():
+                        self.run_once()
+                except Exception as e:
+                    print(f"❌ 목표 미리 계산 중 오류: {e}")
+                if self._stop.wait(self.interval):
+                    return
+        finally:
+            self._release_lock()
+    
+    def stats(self):
+        """스레드 실행 여부와 최근 실행 결과"""
+        with self._lock:
+            return {
+                'running': self._thread is not None and self._thread.is_alive(),
+                'leader': self._lock_file is not None or (self.lock_path is None and self._thread is not None),
+                'recent': list(self.history)
+            }
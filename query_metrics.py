@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""쿼리/처리 단계별 시간 측정과 느린 쿼리 로그
+
+- 쿼리마다 전체 시간, 실행/가져오기 시간, 행 수, 가져온 데이터 크기(추정)를 집계
+- 기준 시간(SLOW_QUERY_MS)을 넘은 쿼리는 JSON lines 로그(SLOW_QUERY_LOG)에 기록하고,
+  EXPLAIN_SLOW_QUERIES=1이면 EXPLAIN (ANALYZE, BUFFERS) 실행 계획도 함께 기록
+- /api/calculate 처리 단계(DB 조회, 요일별 평균, 영업일수, 직렬화) 시간은 phase()로 측정
+"""
+
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import os
+import re
+import threading
+import time
+
+# 쿼리 모양이 같은 것끼리 묶기 위해 문자열/숫자 상수를 ?로 바꿈
+_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+def normalize_query(query):
+    """공백을 하나로 합친 쿼리 문자열"""
+    return _WHITESPACE_PATTERN.sub(' ', query).strip()
+
+def query_fingerprint(query):
+    """상수를 ?로 바꾼 쿼리 모양 (같은 쿼리를 다른 기간으로 실행한 것끼리 묶음)"""
+    return _LITERAL_PATTERN.sub('?', normalize_query(query))
+
+def estimate_result_bytes(rows, sample_size=100):
+    """가져온 결과의 대략적인 크기 (앞쪽 행의 텍스트 길이로 추정)"""
+    if not rows:
+        return 0
+    sample = rows[:sample_size]
+    sample_bytes = sum(len(str(value)) for row in sample for value in row if value is not None)
+    return sample_bytes * len(rows) // len(sample)
+
+class _TimingStats:
+    """횟수, 합계, 최대, 최근 값 기준 p95"""
+    def __init__(self, recent_size=1000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=recent_size)
+        self.sample = None  # 마지막으로 성공한 (쿼리, 파라미터) - 인덱스 추천에서 다시 EXPLAIN할 때 사용
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def summary(self):
+        recent = sorted(self.recent)
+        return {
+            'count': self.count,
+            'total_ms': round(self.total * 1000, 1),
+            'avg_ms': round(self.total / self.count * 1000, 1) if self.count else 0,
+            'p95_ms': round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000, 1) if recent else 0,
+            'max_ms': round(self.max * 1000, 1)
+        }
+
+class QueryMetrics:
+    """프로세스 전체의 쿼리/단계별 시간 통계 (여러 스레드에서 함께 사용)"""
+    def __init__(self, slow_query_ms=1000, slow_query_log=None, explain_slow=False, max_fingerprints=50):
+        self.slow_query_ms = slow_query_ms
+        self.slow_query_log = slow_query_log
+        self.explain_slow = explain_slow
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()  # 로그 파일 쓰기 전용 (통계 잠금을 잡은 채로 디스크를 기다리지 않도록)
+        self.reset()
+
+    def reset(self):
+        """통계 초기화"""
+        with self._lock:
+            self.started_at = datetime.now().isoformat(timespec='seconds')
+            self.queries = _TimingStats()
+            self.execute = _TimingStats()
+            self.fetch = _TimingStats()
+            self.rows = 0
+            self.bytes_fetched = 0
+            self.errors = 0
+            self.slow_queries = 0
+            self.recent_slow = deque(maxlen=20)
+            self.by_fingerprint = {}
+            self.phases = {}
+
+    def is_slow(self, seconds):
+        return seconds * 1000 >= self.slow_query_ms
+
+    def record_query(self, query, execute_s, fetch_s=0.0, row_count=0, bytes_fetched=0, error=None, plan=None,
+                     params=None):
+        """쿼리 한 번의 측정값 기록 (느린 쿼리는 로그 파일에도 기록)"""
+        wall_s = execute_s + fetch_s
+        fingerprint = query_fingerprint(query)
+
+        with self._lock:
+            self.queries.add(wall_s)
+            self.execute.add(execute_s)
+            self.fetch.add(fetch_s)
+            self.rows += row_count
+            self.bytes_fetched += bytes_fetched
+            if error is not None:
+                self.errors += 1
+
+            stats = self.by_fingerprint.get(fingerprint)
+            if stats is None:
+                if len(self.by_fingerprint) >= self.max_fingerprints:
+                    # 가장 적게 실행된 쿼리 모양을 버리고 새 모양 기록
+                    del self.by_fingerprint[min(self.by_fingerprint, key=lambda key: self.by_fingerprint[key].count)]
+                stats = self.by_fingerprint[fingerprint] = _TimingStats(recent_size=100)
+            stats.add(wall_s)
+            if error is None:
+                stats.sample = (query, params)
+
+            slow = self.is_slow(wall_s)
+            if slow:
+                self.slow_queries += 1
+
+        if not slow and error is None:
+            return
+
+        entry = {
+            'time': datetime.now().isoformat(timespec='milliseconds'),
+            'wall_ms': round(wall_s * 1000, 1),
+            'execute_ms': round(execute_s * 1000, 1),
+            'fetch_ms': round(fetch_s * 1000, 1),
+            'rows': row_count,
+            'bytes': bytes_fetched,
+            'fingerprint': fingerprint,
+            'query': normalize_query(query)
+        }
+        if error is not None:
+            entry['error'] = str(error).strip()
+        if plan is not None:
+            entry['plan'] = plan
+
+        with self._lock:
+            self.recent_slow.append({key: value for key, value in entry.items() if key not in ('query', 'plan')})
+
+        # 파일 쓰기는 통계 잠금을 푼 뒤에 (다른 요청 스레드의 기록이 디스크 I/O를 기다리지 않음)
+        if self.slow_query_log:
+            line = json.dumps(entry, ensure_ascii=False, default=str) + '\n'
+            with self._log_lock:
+                with open(self.slow_query_log, 'a', encoding='utf-8') as f:
+                    f.write(line)
+
+    def record_phase(self, name, seconds):
+        """처리 단계 하나의 소요 시간 기록"""
+        with self._lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = _TimingStats()
+            stats.add(seconds)
+
+    @contextmanager
+    def phase(self, name):
+        """with metrics.phase('calculate.db'): ... 블록의 소요 시간 기록"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, time.perf_counter() - started)
+
+    def statement_samples(self):
+        """지금까지 실행된 쿼리 모양별 [{'fingerprint', 'query', 'params', 'count', 'total_ms'}] (총 시간 순)"""
+        with self._lock:
+            items = sorted(self.by_fingerprint.items(), key=lambda item: item[1].total, reverse=True)
+            return [
+                {
+                    'fingerprint': fingerprint,
+                    'query': stats.sample[0],
+                    'params': stats.sample[1],
+                    'count': stats.count,
+                    'total_ms': round(stats.total * 1000, 1)
+                }
+                for fingerprint, stats in items if stats.sample is not None
+            ]
+
+    def snapshot(self):
+        """현재까지의 통계 (/api/metrics 응답용)"""
+        with self._lock:
+            top_queries = sorted(self.by_fingerprint.items(), key=lambda item: item[1].total, reverse=True)[:10]
+            return {
+                'since': self.started_at,
+                'queries': dict(
+                    self.queries.summary(),
+                    execute_ms=self.execute.summary()['total_ms'],
+                    fetch_ms=self.fetch.summary()['total_ms'],
+                    rows=self.rows,
+                    bytes_fetched=self.bytes_fetched,
+                    errors=self.errors,
+                    slow=self.slow_queries,
+                    slow_query_ms=self.slow_query_ms
+                ),
+                'top_queries': [dict(stats.summary(), fingerprint=fingerprint[:300]) for fingerprint, stats in top_queries],
+                'recent_slow': list(self.recent_slow),
+                'phases': {name: stats.summary() for name, stats in sorted(self.phases.items())}
+            }
+
+metrics = QueryMetrics(
+    slow_query_ms=float(os.environ.get('SLOW_QUERY_MS', 1000)),
+    slow_query_log=os.environ.get('SLOW_QUERY_LOG') or None,
+    explain_slow=os.environ.get('EXPLAIN_SLOW_QUERIES') == '1'
+)
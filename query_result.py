@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""열 단위 쿼리 결과 (QueryResult)
+
+execute_query 결과를 행 튜플 목록 대신 열마다 타입이 정해진 numpy 배열로 보관
+- 정수/실수/불리언: int64/float64/bool 배열 (NULL은 별도 마스크)
+- 소수(Decimal): 소수 자릿수가 모두 같으면 10^자릿수를 곱한 정수 배열 (고정 소수점, 값이 그대로 유지됨)
+- 날짜/시간: datetime64 배열 (시간대가 있는 값은 오프셋이 모두 같을 때 현지 시각 + 시간대로 보관)
+- 문자열: 사전 인코딩 (고유값 목록 + 정수 코드) - 지점명, 사용자 이름처럼 반복되는 값을 한 번만 저장
+- 그 밖의 값이나 타입이 섞인 열: object 배열
+
+열 배열은 복사 없이 꺼낼 수 있고(array), 슬라이스는 배열 뷰를 공유하며, 행 튜플은 필요할 때만 만듦
+기존 코드와 호환되도록 result['columns'], result['data'], result['row_count']도 지원
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import repeat
+import numpy as np
+import operator
+
+class _Column:
+    """열 하나 (kind에 따라 values 배열의 의미가 다름)"""
+    __slots__ = ('kind', 'values', 'mask', 'labels', 'scale', 'tz')
+    
+    def __init__(self, kind, values, mask=None, labels=None, scale=0, tz=None):
+        self.kind = kind      # 'int', 'float', 'bool', 'decimal', 'date', 'datetime', 'str', 'object'
+        self.values = values  # numpy 배열 ('str'은 labels의 코드)
+        self.mask = mask      # NULL 위치 (NULL이 없으면 None, 'date'/'datetime'/'str'/'object'는 사용 안 함)
+        self.labels = labels  # 'str' 열의 고유값 목록 (None 포함 가능)
+        self.scale = scale    # 'decimal' 열의 소수 자릿수
+        self.tz = tz          # 'datetime' 열의 시간대
+    
+    def _derive(self, values, mask):
+        return _Column(self.kind, values, mask, self.labels, self.scale, self.tz)
+    
+    def take(self, indices):
+        """indices 위치의 값만 모은 열 (슬라이스면 배열 뷰를 공유)"""
+        return self._derive(self.values[indices], None if self.mask is None else self.mask[indices])
+    
+    def to_list(self):
+        """파이썬 값 목록 (DB에서 받은 것과 같은 타입)"""
+        kind = self.kind
+        if kind == 'str':
+            labels = self.labels
+            return [labels[code] for code in self.values.tolist()]
+        if kind in ('date', 'datetime'):
+            values = self.values.astype(object).tolist()  # NaT는 None
+            if self.tz is not None:
+                values = [None if value is None else value.replace(tzinfo=self.tz) for value in values]
+            return values
+        if kind == 'object':
+            return self.values.tolist()
+        
+        if kind == 'decimal':
+            scale = -self.scale
+            values = [Decimal(value).scaleb(scale) for value in self.values.tolist()]
+        else:
+            values = self.values.tolist()
+        if self.mask is not None:
+            values = [None if null else value for value, null in zip(values, self.mask.tolist())]
+        return values
+    
+    @property
+    def nbytes(self):
+        size = self.values.nbytes + (0 if self.mask is None else self.mask.nbytes)
+        if self.labels is not None:
+            size += sum(len(label) for label in self.labels if isinstance(label, str))
+        return size
+
+def _object_array(values):
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+def _dictionary_column(labels, codes):
+    """(고유값 목록, 코드)로 문자열 열 생성 - 같은 값이 여러 번 있으면 하나로 합침"""
+    unique = list(dict.fromkeys(labels))
+    if len(unique) != len(labels):
+        index = {label: code for code, label in enumerate(unique)}
+        remap = np.array([index[label] for label in labels], dtype=np.int32)
+        codes = remap[codes]
+        labels = unique
+    return _Column('str', np.asarray(codes, dtype=np.int32), labels=list(labels))
+
+def _null_mask(values):
+    """NULL 위치 불리언 배열 (== 비교 없이 is None으로 확인)"""
+    return np.fromiter(map(operator.is_, values, repeat(None)), dtype=np.bool_, count=len(values))
+
+def _decimal_column(values, mask):
+    """Decimal 값 목록을 고정 소수점 열로 변환 (소수 자릿수가 모두 같고 int64에 들어갈 때만, 아니면 None)
+    
+    Decimal 연산 대신 문자열 표현('-12.34')에서 자릿수를 확인하고 점을 빼서 정수로 읽음
+    """
+    present = values if mask is None else [value for value, null in zip(values, mask.tolist()) if not null]
+    texts = list(map(str, present))
+    # 지수 표기('1E+2'), NaN, Infinity는 그대로 보관
+    digits = ''.join(texts).replace('.', '').replace('-', '')
+    if not (digits.isascii() and digits.isdigit()):
+        return None
+    
+    count = len(texts)
+    dots = np.fromiter(map(str.rfind, texts, repeat('.')), dtype=np.int64, count=count)
+    if (dots == -1).all():
+        scale = 0
+    else:
+        scales = np.fromiter(map(len, texts), dtype=np.int64, count=count) - dots - 1
+        if (dots == -1).any() or (scales != scales[0]).any():
+            return None
+        scale = int(scales[0])
+    
+    try:
+        scaled = np.fromiter(map(int, map(str.replace, texts, repeat('.'), repeat(''))), dtype=np.int64, count=count)
+    except OverflowError:
+        return None
+    if mask is not None:
+        filled = np.zeros(len(values), dtype=np.int64)
+        filled[~mask] = scaled
+        scaled = filled
+    return _Column('decimal', scaled, mask, scale=scale)
+
+def _build_column(values):
+    """파이썬 값 목록을 타입에 맞는 열로 변환 (NULL 외의 값 타입이 하나가 아니면 object 배열)"""
+    count = len(values)
+    types = set(map(type, values))
+    has_null = type(None) in types
+    types.discard(type(None))
+    value_type = types.pop() if len(types) == 1 else None
+    mask = _null_mask(values) if has_null and value_type is not None else None
+    
+    if value_type is str:
+        labels = list(dict.fromkeys(values))
+        index = {label: code for code, label in enumerate(labels)}
+        codes = np.fromiter(map(index.__getitem__, values), dtype=np.int32, count=count)
+        return _Column('str', codes, labels=labels)
+    
+    if value_type in (int, float, bool):
+        kind = {int: 'int', float: 'float', bool: 'bool'}[value_type]
+        dtype = {int: np.int64, float: np.float64, bool: np.bool_}[value_type]
+        if mask is not None:
+            values = [value_type() if value is None else value for value in values]
+        try:
+            return _Column(kind, np.fromiter(values, dtype=dtype, count=count), mask)
+        except OverflowError:
+            # int64 범위를 넘는 정수
+            return _Column('object', _object_array([None if mask is not None and mask[i] else value
+                                                   for i, value in enumerate(values)]))
+    
+    if value_type is Decimal:
+        column = _decimal_column(values, mask)
+        if column is not None:
+            return column
+    
+    if value_type is date:
+        return _Column('date', np.array(values, dtype='datetime64[D]'))
+    
+    if value_type is datetime:
+        offsets = {value.utcoffset() for value in values if value is not None}
+        if len(offsets) == 1:
+            tz = next(value.tzinfo for value in values if value is not None)
+            if tz is not None:
+                values = [None if value is None else value.replace(tzinfo=None) for value in values]
+            return _Column('datetime', np.array(values, dtype='datetime64[us]'), tz=tz)
+    
+    return _Column('object', _object_array(values))
+
+class QueryResult:
+    """열 단위 쿼리 결과
+    
+    - columns: 열 이름 목록, row_count / len(): 행 수
+    - array(열): 저장된 배열을 복사 없이 반환, floats(열): float64 배열, factorize(열): (고유값, 코드)
+    - result[시작:끝], take(위치): 행 일부 (슬라이스는 배열 뷰를 공유)
+    - for row in result / rows() / iter_batches(): 행 튜플은 필요할 때만 만듦
+    - result['columns'] / ['data'] / ['row_count']: 기존 dict 결과와 같은 방식으로 사용 가능
+    """
+    def __init__(self, columns, data_columns, row_count):
+        self.columns = list(columns)
+        self._data = list(data_columns)
+        self.row_count = row_count
+    
+    @classmethod
+    def from_rows(cls, columns, rows):
+        """행 튜플 목록으로 생성"""
+        if rows:
+            values_by_column = list(zip(*rows))
+        else:
+            values_by_column = [[] for _ in columns]
+        return cls.from_columns(columns, values_by_column)
+    
+    @classmethod
+    def from_columns(cls, columns, values_by_column):
+        """열별 값 목록으로 생성"""
+        data_columns = [_build_column(values) for values in values_by_column]
+        row_count = len(values_by_column[0]) if values_by_column else 0
+        return cls(columns, data_columns, row_count)
+    
+    @classmethod
+    def from_arrow(cls, table):
+        """pyarrow Table로 생성 (NULL 없는 숫자 열은 복사 없이, 사전 인코딩 열은 코드 그대로 사용)"""
+        import pyarrow as pa
+        
+        data_columns = []
+        for chunked in table.columns:
+            array = chunked.combine_chunks() if chunked.num_chunks != 1 else chunked.chunk(0)
+            if pa.types.is_dictionary(array.type):
+                labels = array.dictionary.to_pylist()
+                indices = array.indices
+                if indices.null_count:
+                    indices = indices.fill_null(len(labels))
+                    labels.append(None)
+                data_columns.append(_dictionary_column(labels, indices.to_numpy(zero_copy_only=False)))
+            elif array.null_count == 0 and pa.types.is_integer(array.type):
+                data_columns.append(_Column('int', array.to_numpy()))
+            elif array.null_count == 0 and pa.types.is_floating(array.type):
+                data_columns.append(_Column('float', array.to_numpy()))
+            else:
+                data_columns.append(_build_column(array.to_pylist()))
+        return cls(table.column_names, data_columns, table.num_rows)
+    
+    def to_arrow(self):
+        """pyarrow Table로 변환 (문자열 열은 사전 인코딩 그대로)"""
+        import pyarrow as pa
+        
+        arrays = []
+        for column in self._data:
+            if column.kind == 'str':
+                # None은 사전 값이 아니라 NULL 코드로 표시 (사전에서 빼고 코드를 당김)
+                codes, mask = column.values, None
+                if None in column.labels:
+                    null_code = column.labels.index(None)
+                    mask = codes == null_code
+                    codes = np.where(codes > null_code, codes - 1, codes)
+                dictionary = pa.array([label for label in column.labels if label is not None], pa.string())
+                arrays.append(pa.DictionaryArray.from_arrays(pa.array(codes, mask=mask), dictionary))
+            elif column.kind in ('int', 'float', 'bool'):
+                arrays.append(pa.array(column.values, mask=column.mask))
+            elif column.kind == 'date' or (column.kind == 'datetime' and column.tz is None):
+                mask = np.isnat(column.values)
+                arrays.append(pa.array(column.values, mask=mask if mask.any() else None))
+            elif column.kind == 'decimal':
+                arrays.append(pa.array(column.to_list(), pa.decimal128(38, column.scale)))
+            else:
+                array = pa.array(column.to_list())
+                # 전부 NULL인 열은 문자열 열로 저장 (save_to_parquet 스트리밍 경로와 같은 형식)
+                arrays.append(array.cast(pa.string()) if pa.types.is_null(array.type) else array)
+        return pa.Table.from_arrays(arrays, names=self.columns)
+    
+    def _index(self, key):
+        return key if isinstance(key, int) else self.columns.index(key)
+    
+    def _column(self, key):
+        return self._data[self._index(key)]
+    
+    def kind(self, key):
+        """열 저장 방식 ('int', 'float', 'bool', 'decimal', 'date', 'datetime', 'str', 'object')"""
+        return self._column(key).kind
+    
+    def array(self, key):
+        """열의 저장 배열 (복사 없음, 'str'은 labels의 코드, 'decimal'은 10^scale을 곱한 정수)"""
+        return self._column(key).values
+    
+    def null_mask(self, key):
+        """NULL 위치 불리언 배열 (NULL이 없으면 None)"""
+        column = self._column(key)
+        if column.mask is not None or column.kind in ('int', 'float', 'bool', 'decimal'):
+            return column.mask
+        if column.kind in ('date', 'datetime'):
+            mask = np.isnat(column.values)
+        elif column.kind == 'str':
+            null_codes = [code for code, label in enumerate(column.labels) if label is None]
+            mask = np.isin(column.values, null_codes)
+        else:
+            mask = np.fromiter((value is None for value in column.values), dtype=np.bool_, count=len(column.values))
+        return mask if mask.any() else None
+    
+    def labels(self, key):
+        """'str' 열의 고유값 목록 (코드가 가리키는 값)"""
+        return self._column(key).labels
+    
+    def scale(self, key):
+        """'decimal' 열의 소수 자릿수"""
+        return self._column(key).scale
+    
+    def floats(self, key, null=0.0):
+        """숫자 열을 float64 배열로 (NULL은 null 값으로 채움)"""
+        column = self._column(key)
+        if column.kind == 'decimal':
+            values = column.values / (10.0 ** column.scale)
+        elif column.kind in ('int', 'float', 'bool'):
+            values = column.values.astype(np.float64)
+        else:
+            values = np.array([null if value is None else float(value) for value in column.to_list()],
+                              dtype=np.float64)
+        if column.mask is not None:
+            values = np.where(column.mask, null, values)
+        return values
+    
+    def factorize(self, key):
+        """열을 (처음 나온 순서의 고유값 목록, 정수 코드 배열)로 변환 (None도 하나의 값으로 취급)"""
+        column = self._column(key)
+        if column.kind == 'str' or (column.mask is None and column.kind in ('int', 'bool', 'date', 'datetime')):
+            uniques, first_rows, inverse = np.unique(column.values, return_index=True, return_inverse=True)
+            order = np.argsort(first_rows, kind='stable')
+            remap = np.empty(len(order), dtype=np.intp)
+            remap[order] = np.arange(len(order))
+            codes = remap[inverse.reshape(-1)]
+            if column.kind == 'str':
+                labels = [column.labels[uniques[position]] for position in order]
+            else:
+                labels = column.take(first_rows[order]).to_list()
+            return labels, codes
+        
+        values = column.to_list()
+        labels = list(dict.fromkeys(values))
+        index = {value: code for code, value in enumerate(labels)}
+        codes = np.fromiter(map(index.__getitem__, values), dtype=np.intp, count=len(values))
+        return labels, codes
+    
+    def column_values(self, key):
+        """열의 파이썬 값 목록"""
+        return self._column(key).to_list()
+    
+    def to_json_columns(self):
+        """열별 JSON 값 목록 (columns와 같은 순서)
+        
+        문자열/날짜 열은 {'dictionary': 이 결과에 나오는 고유값, 'codes': 행별 코드},
+        숫자 열은 {'values': 값 목록} (소수도 JSON 숫자), 그 밖의 열은 파이썬 값 그대로 (NULL은 None)
+        """
+        encoded = []
+        for index, column in enumerate(self._data):
+            if column.kind in ('str', 'date', 'datetime'):
+                labels, codes = self.factorize(index)
+                if column.kind != 'str':
+                    labels = [None if label is None else label.isoformat() for label in labels]
+                encoded.append({'dictionary': labels, 'codes': codes.tolist()})
+            elif column.kind in ('int', 'float', 'bool', 'decimal'):
+                values = (self.floats(index) if column.kind == 'decimal' else column.values).tolist()
+                if column.mask is not None:
+                    values = [None if null else value for value, null in zip(values, column.mask.tolist())]
+                encoded.append({'values': values})
+            else:
+                encoded.append({'values': column.to_list()})
+        return encoded
+    
+    def take(self, indices):
+        """indices 위치의 행만 모은 결과 (정수 배열, 불리언 마스크, 슬라이스)"""
+        data_columns = [column.take(indices) for column in self._data]
+        row_count = len(data_columns[0].values) if data_columns else len(range(self.row_count)[indices])
+        return QueryResult(self.columns, data_columns, row_count)
+    
+    def select(self, keys):
+        """keys 열만 고른 결과 (배열 공유)"""
+        return QueryResult([self.columns[self._index(key)] for key in keys],
+                           [self._column(key) for key in keys], self.row_count)
+    
+    def rename(self, mapping):
+        """열 이름 바꾸기 (배열 공유)"""
+        return QueryResult([mapping.get(name, name) for name in self.columns], self._data, self.row_count)
+    
+    def with_dictionary_column(self, name, labels, codes, position=None):
+        """(고유값 목록, 코드 배열)로 만든 문자열 열을 position 위치(기본: 끝)에 추가한 결과"""
+        position = len(self.columns) if position is None else position
+        columns = self.columns[:position] + [name] + self.columns[position:]
+        data_columns = self._data[:position] + [_dictionary_column(labels, codes)] + self._data[position:]
+        return QueryResult(columns, data_columns, self.row_count)
+    
+    def map_labels(self, key, func):
+        """'str' 열의 고유값마다 func를 한 번씩 적용한 결과 (행마다 변환하지 않음)"""
+        index = self._index(key)
+        column = self._data[index]
+        if column.kind == 'str':
+            labels, codes = column.labels, column.values
+        else:
+            # 전부 NULL이라 문자열 열이 아닌 경우 등
+            labels, codes = self.factorize(index)
+        data_columns = list(self._data)
+        data_columns[index] = _dictionary_column([func(label) for label in labels], codes)
+        return QueryResult(self.columns, data_columns, self.row_count)
+    
+    def rows(self):
+        """행 튜플 목록"""
+        return list(zip(*(column.to_list() for column in self._data))) if self._data else []
+    
+    def iter_batches(self, size=10000):
+        """size개씩 행 튜플 목록을 차례로 반환 (전체 행을 한 번에 만들지 않음)"""
+        for start in range(0, self.row_count, size):
+            yield self.take(slice(start, start + size)).rows()
+    
+    @property
+    def nbytes(self):
+        """열 배열이 차지하는 대략적인 메모리 크기"""
+        return sum(column.nbytes for column in self._data)
+    
+    def __len__(self):
+        return self.row_count
+    
+    def __bool__(self):
+        # 기존 dict 결과처럼 행이 없어도 조회 성공한 결과는 참
+        return True
+    
+    def __iter__(self):
+        for batch in self.iter_batches():
+            yield from batch
+    
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.take(key)
+        if isinstance(key, int):
+            if key < 0:
+                key += self.row_count
+            if not 0 <= key < self.row_count:
+                raise IndexError(key)
+            return self.take(slice(key, key + 1)).rows()[0]
+        if key == 'columns':
+            return self.columns
+        if key == 'data':
+            return self.rows()
+        if key == 'row_count':
+            return self.row_count
+        raise KeyError(key)
+    
+    def __contains__(self, key):
+        return key in ('columns', 'data', 'row_count')
+    
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+    
+    def __repr__(self):
+        kinds = ', '.join(f"{name}: {column.kind}" for name, column in zip(self.columns, self._data))
+        return f"<QueryResult {self.row_count}행 ({kinds})>"